@@ -0,0 +1,109 @@
+"""Recall@k of reduced embeddings against the full-dimension baseline.
+
+Reads the full-width vectors from a FAISS store built with
+EMBEDDING_REDUCTION=none, then for each method (truncate, pca) and target
+dimension reports recall@k of exact cosine search against the full-width
+ranking, bytes per vector and brute-force search time.
+
+Queries are a sample of corpus chunks (leave-one-out) unless --queries points
+at a JSONL file of {"question": ...} records, which are embedded via Ollama.
+
+Usage: python benchmarks/reduction_benchmark.py [--store ./vector_store] [--k 10] [--dims 128 256 512]
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple"))
+
+import argparse
+import json
+import time
+
+import embedding_reduction
+
+
+def normalise(matrix):
+    import numpy as np
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(corpus, queries, k: int, exclude=None):
+    """Exact cosine top-k ids (rows already normalised) and search time in ms."""
+    import numpy as np
+
+    start = time.perf_counter()
+    scores = queries @ corpus.T
+    if exclude is not None:
+        # Leave-one-out: a corpus chunk used as a query must not match itself
+        scores[np.arange(len(exclude)), exclude] = -np.inf
+    ids = np.argpartition(-scores, k, axis=1)[:, :k]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return ids, elapsed_ms
+
+
+def recall(baseline, candidate) -> float:
+    hits = sum(len(set(b) & set(c)) for b, c in zip(baseline, candidate))
+    return hits / baseline.size
+
+
+def load_queries(path: str):
+    """Embed questions from a JSONL file with the full-width model."""
+    import ollama_clients
+
+    with open(path, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    return ollama_clients.get_embeddings(os.environ["EMBEDDINGS_MODEL"]).embed_documents(questions)
+
+
+def main():
+    import faiss
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", default="./vector_store", help="FAISS store with full-width vectors")
+    parser.add_argument("--queries", help="Optional JSONL file of {\"question\": ...} records")
+    parser.add_argument("--num-queries", type=int, default=200, help="Corpus chunks sampled as queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 512])
+    args = parser.parse_args()
+
+    index = faiss.read_index(os.path.join(args.store, "index.faiss"))
+    corpus = normalise(index.reconstruct_n(0, index.ntotal).astype(np.float32))
+    full_dims = corpus.shape[1]
+    print(f"Corpus: {corpus.shape[0]} vectors x {full_dims} dimensions from {args.store}")
+
+    if args.queries:
+        queries = normalise(np.asarray(load_queries(args.queries), dtype=np.float32))
+        exclude = None
+    else:
+        rng = np.random.default_rng(0)
+        exclude = rng.choice(len(corpus), size=min(args.num_queries, len(corpus)), replace=False)
+        queries = corpus[exclude]
+
+    k = min(args.k, len(corpus) - 1)
+    baseline, baseline_ms = top_k(corpus, queries, k, exclude)
+    print(f"{'method':<10}{'dims':>6}{'recall@' + str(k):>11}{'bytes/vec':>11}{'search ms':>11}")
+    print(f"{'full':<10}{full_dims:>6}{1.0:>11.3f}{full_dims * 4:>11}{baseline_ms:>11.1f}")
+
+    for dims in args.dims:
+        if dims >= full_dims:
+            continue
+        for method in ("truncate", "pca"):
+            if method == "pca" and dims > len(corpus):
+                print(f"{method:<10}{dims:>6}  skipped: needs at least {dims} vectors")
+                continue
+            # PCA is fitted on the corpus, as the loaders do at ingest time
+            pca = embedding_reduction.fit_pca(corpus, dims) if method == "pca" else None
+            reduced_corpus = embedding_reduction.reduce(corpus, method, dims, pca)
+            reduced_queries = embedding_reduction.reduce(queries, method, dims, pca)
+            candidate, search_ms = top_k(reduced_corpus, reduced_queries, k, exclude)
+            print(
+                f"{method:<10}{dims:>6}{recall(baseline, candidate):>11.3f}"
+                f"{dims * 4:>11}{search_ms:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
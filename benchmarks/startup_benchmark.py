@@ -0,0 +1,87 @@
+"""Cold-start benchmark for the search and chat CLIs.
+
+Runs each entry point in a fresh interpreter with `python -X importtime`,
+reports the median wall time and the slowest top-level imports, and exits
+non-zero when a target goes over its cold-start budget.
+
+Usage: python benchmarks/startup_benchmark.py [runs] [budget_ms]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start budget (ms) per target. The search CLIs are invoked from scripts
+# thousands of times, so `--help` / argument errors must not pay for
+# langchain, the Azure SDKs or the Ollama client.
+DEFAULT_BUDGET_MS = 250
+
+TARGETS: Dict[str, Tuple[str, List[str]]] = {
+    "simple_vector_search --help": ("simple", ["simple/simple_vector_search.py", "--help"]),
+    "vector_search --help": ("cosmosdb", ["cosmosdb/vector_search.py", "--help"]),
+    "import simple_rag_chain": ("simple", ["-c", "import simple_rag_chain"]),
+    "import cosmos_rag_chain": ("cosmosdb", ["-c", "import cosmos_rag_chain"]),
+}
+
+
+def run_once(cwd: str, args: List[str]) -> Tuple[float, str]:
+    """Run one cold interpreter and return (wall ms, importtime log)."""
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, cwd), PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return elapsed_ms, proc.stderr
+
+
+def slowest_imports(log: str, limit: int = 5) -> List[Tuple[int, str]]:
+    """Parse `-X importtime` output and return the slowest top-level imports."""
+    entries = []
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        # Top-level imports are indented by exactly one space
+        if name.startswith(" ") and not name.startswith("  "):
+            entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:limit]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUDGET_MS
+
+    over_budget = []
+    for label, (cwd, args) in TARGETS.items():
+        timings = []
+        log = ""
+        for _ in range(runs):
+            elapsed_ms, log = run_once(cwd, args)
+            timings.append(elapsed_ms)
+
+        median_ms = statistics.median(timings)
+        status = "OK" if median_ms <= budget_ms else "OVER BUDGET"
+        print(f"{label}: median {median_ms:.1f} ms over {runs} runs (budget {budget_ms:.0f} ms) {status}")
+        for cumulative_us, name in slowest_imports(log):
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+
+        if median_ms > budget_ms:
+            over_budget.append(label)
+
+    if over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
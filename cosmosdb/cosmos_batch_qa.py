@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", "simple"))
+
+import batch_qa
+import cosmos_rag_chain
+import cosmosdb_vector_store
+import cosmos_replica
+import ollama_clients
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+def build_prompt(question: str, docs: list) -> str:
+    """Fill the Cosmos RAG chain template for one question."""
+    return cosmos_rag_chain.template.format(
+        context=cosmos_rag_chain._format_docs(docs), question=question
+    )
+
+
+def main():
+    """Batch RAG over the Cosmos DB store (or its local replica)."""
+    args = batch_qa.parse_args("Answer questions from a JSONL file using Azure Cosmos DB.")
+
+    try:
+        if cosmos_replica.replica_enabled:
+            replica = cosmos_replica.get_replica()
+            store, embeddings = replica.store, replica.embeddings
+        else:
+            store = cosmosdb_vector_store.get_instance(create_container=False)
+            embeddings = cosmosdb_vector_store.get_embeddings()
+        llm = ollama_clients.get_llm(os.getenv("CHAT_MODEL", "llama3"))
+        ollama_clients.warm_up(
+            cosmosdb_vector_store.embeddings_model_name, os.getenv("CHAT_MODEL", "llama3")
+        )
+
+        count = batch_qa.run_batch(
+            args.questions,
+            args.output,
+            store,
+            embeddings,
+            llm,
+            build_prompt,
+            top_k=args.top_k,
+            conditions=args.filters,
+        )
+        print(f"Wrote {count} records to {args.output}")
+
+    except Exception as e:
+        logger.error(f"Batch run failed: {str(e)}")
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", "simple"))
 
-from langchain_community.llms import Ollama
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
 import cosmosdb_vector_store
+import cosmos_replica
+import multi_query
+import filtered_search
+import rerank
+import retrieval_cache
+import ollama_clients
 import logging
 import os
 
@@ -14,18 +17,11 @@ import os
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
-def create_rag_chain():
-    """Create a RAG chain with Cosmos DB vector store."""
-    
-    # Initialize the vector store
-    vector_store = cosmosdb_vector_store.get_instance(create_container=False)
-    retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-    
-    # Initialize the LLM
-    llm = Ollama(model=os.getenv("CHAT_MODEL", "llama3"))
-    
-    # Create a prompt template
-    template = """Use the following pieces of context to answer the question at the end.
+# Optional metadata filter applied inside the search, e.g. "source=docs/a.md;date>=2024-01-01"
+rag_filter = filtered_search.parse_filters(os.environ.get("RAG_FILTER"))
+
+# Prompt template shared by the interactive chain and batch mode
+template = """Use the following pieces of context to answer the question at the end.
     If you don't know the answer, just say that you don't know, don't try to make up an answer.
     Use three sentences maximum and keep the answer as concise as possible.
 
@@ -35,7 +31,49 @@ def create_rag_chain():
     Question: {question}
 
     Helpful Answer:"""
+
+
+def create_rag_chain(conversation_history=None):
+    """Create a RAG chain with Cosmos DB vector store.
+
+    With MULTI_QUERY=true, retrieval also searches a rewrite of the question
+    resolved against conversation_history, a list of (question, answer) pairs.
+    RAG_FILTER restricts retrieval to chunks with matching metadata, and
+    RETRIEVAL_CACHE=true serves repeated questions from the retrieval cache.
+    RERANK=true over-fetches candidates and reranks them locally.
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+    from langchain_core.output_parsers import StrOutputParser
+    
+    # Initialize the vector store
+    if cosmos_replica.replica_enabled:
+        replica = cosmos_replica.get_replica()
+        vector_store, embeddings = replica.store, replica.embeddings
+    else:
+        embeddings = cosmosdb_vector_store.get_embeddings()
+        vector_store = cosmosdb_vector_store.get_instance(create_container=False, embeddings=embeddings)
+    retriever = vector_store.as_retriever(search_kwargs={"k": 5})
+    
+    # Initialize the LLM
+    llm = ollama_clients.get_llm(os.getenv("CHAT_MODEL", "llama3"))
     
+    if multi_query.multi_query_enabled or rag_filter or retrieval_cache.cache_enabled or rerank.rerank_enabled:
+        history_turns = conversation_history if conversation_history is not None else []
+
+        def _retrieve(question):
+            queries = [question]
+            if multi_query.multi_query_enabled:
+                history = _format_history(history_turns)
+                queries = multi_query.query_variants(llm, question, history, bool(history_turns))
+            if cosmos_replica.replica_enabled:
+                scope = cosmos_replica.cache_scope()
+            else:
+                scope = cosmosdb_vector_store.cache_scope()
+            return multi_query.retrieve(vector_store, embeddings, queries, 5, rag_filter, scope)
+
+        retriever = RunnableLambda(_retrieve)
+
     prompt = ChatPromptTemplate.from_template(template)
     
     # Create the RAG chain
@@ -54,18 +92,27 @@ def _format_docs(docs):
     return "\n\n".join(doc.page_content for doc in docs)
 
 
+def _format_history(history, max_turns: int = 5):
+    """Format the last (question, answer) pairs for the query rewrite."""
+    return "\n".join(
+        f"Human: {q}\nAssistant: {a}" for q, a in history[-max_turns:]
+    )
+
+
 def main():
     """Interactive chat with RAG chain."""
     
     try:
         print("Initializing RAG chain with Cosmos DB vector store...")
-        rag_chain = create_rag_chain()
+        conversation_history = []
+        rag_chain = create_rag_chain(conversation_history)
+        ollama_clients.warm_up(
+            cosmosdb_vector_store.embeddings_model_name, os.getenv("CHAT_MODEL", "llama3")
+        )
         print("RAG chain initialized successfully!")
         print("\nType 'exit' to quit, 'clear' to clear history")
         print("=" * 50)
         
-        conversation_history = []
-        
         while True:
             question = input("\nYour question: ").strip()
             
@@ -90,6 +137,9 @@ def main():
             
             try:
                 print("\nThinking...")
+                if cosmos_replica.replica_enabled:
+                    # Pick up documents loaded since the last poll
+                    cosmos_replica.get_replica()
                 answer = rag_chain.invoke(question)
                 print(f"\nAnswer: {answer}")
                 
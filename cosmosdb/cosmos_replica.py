@@ -0,0 +1,193 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", "simple"))
+
+import cosmosdb_vector_store
+import simple_vector_store
+import embedding_reduction
+import json
+import logging
+import time
+from typing import Optional
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# Serve similarity searches from a local FAISS copy of the Cosmos DB container,
+# kept current by tailing the container's change feed. Cosmos DB stays the
+# system of record; set COSMOS_LOCAL_REPLICA=true to enable.
+replica_enabled = os.environ.get("COSMOS_LOCAL_REPLICA", "false").lower() == "true"
+replica_dir = os.environ.get("COSMOS_REPLICA_DIR", "./cosmos_replica")
+# Minimum seconds between change feed polls in maybe_sync(), shared by all
+# processes through the replica's state file
+sync_interval = float(os.environ.get("COSMOS_REPLICA_SYNC_INTERVAL", "30"))
+
+STATE_FILE = "state.json"
+
+
+class CosmosReplica:
+    """Local FAISS read replica of a Cosmos DB vector container.
+
+    The change feed in latest-version mode does not report deletes; run
+    `python cosmosdb/cosmos_replica.py --rebuild` after deleting documents.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(
+            replica_dir,
+            f"{cosmosdb_vector_store.database_name}_{cosmosdb_vector_store.container_name}",
+        )
+        self.embeddings = cosmosdb_vector_store.get_embeddings()
+        self.container = None
+        self.continuation: Optional[str] = None
+        # Wall-clock time of the last change feed poll by any process
+        self.last_sync = 0.0
+        self.store = self._load()
+
+    def _state_path(self) -> str:
+        return os.path.join(self.path, STATE_FILE)
+
+    def _load(self):
+        """Load the persisted index and continuation token, if compatible."""
+        if os.path.exists(self._state_path()):
+            with open(self._state_path(), "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if (
+                state.get("embeddings_model") == cosmosdb_vector_store.embeddings_model_name
+                and state.get("dimensions") == cosmosdb_vector_store.index_dimensions
+                and state.get("reduction", "none") == embedding_reduction.reduction_method
+            ):
+                self.continuation = state.get("continuation")
+                self.last_sync = state.get("last_sync", 0.0)
+                logger.info(f"Loaded local replica from {self.path}")
+                return simple_vector_store.load_local(self.path, self.embeddings)
+            logger.warning("Local replica was built with different embedding settings; rebuilding")
+
+        return simple_vector_store.create_empty(
+            cosmosdb_vector_store.index_dimensions, self.embeddings
+        )
+
+    def save(self) -> None:
+        """Persist the index together with its continuation token."""
+        os.makedirs(self.path, exist_ok=True)
+        simple_vector_store.save_local(self.store, self.path)
+        self._save_state()
+
+    def _save_state(self) -> None:
+        state = {
+            "continuation": self.continuation,
+            "last_sync": self.last_sync,
+            "embeddings_model": cosmosdb_vector_store.embeddings_model_name,
+            "dimensions": cosmosdb_vector_store.index_dimensions,
+            "reduction": embedding_reduction.reduction_method,
+        }
+        tmp_path = f"{self._state_path()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._state_path())
+
+    def sync(self) -> int:
+        """Apply all changes since the stored continuation token.
+
+        Returns the number of documents inserted or updated.
+        """
+        if self.container is None:
+            self.container = cosmosdb_vector_store.get_container()
+
+        if self.continuation:
+            feed = self.container.query_items_change_feed(continuation=self.continuation)
+        else:
+            feed = self.container.query_items_change_feed(is_start_from_beginning=True)
+
+        texts, embeddings, metadatas, ids = [], [], [], []
+        for item in feed:
+            embedding = item.get(cosmosdb_vector_store.embedding_key)
+            if embedding is None:
+                continue
+            texts.append(item.get(cosmosdb_vector_store.text_key, ""))
+            embeddings.append(embedding)
+            metadatas.append(item.get(cosmosdb_vector_store.metadata_key) or {})
+            ids.append(item["id"])
+
+        continuation = self.container.client_connection.last_response_headers.get("etag")
+
+        if ids:
+            # Updated documents replace their previous version
+            existing = set(self.store.index_to_docstore_id.values())
+            replaced = [doc_id for doc_id in ids if doc_id in existing]
+            if replaced:
+                self.store.delete(replaced)
+            self.store.add_embeddings(
+                text_embeddings=list(zip(texts, embeddings)), metadatas=metadatas, ids=ids
+            )
+
+        self.last_sync = time.time()
+        if ids or continuation != self.continuation:
+            self.continuation = continuation
+            self.save()
+        elif os.path.exists(self._state_path()):
+            # Nothing changed: only record the poll so other processes skip theirs
+            self._save_state()
+
+        logger.info(f"Local replica applied {len(ids)} changes from the change feed")
+        return len(ids)
+
+    def maybe_sync(self) -> int:
+        """Sync if the last poll is older than COSMOS_REPLICA_SYNC_INTERVAL."""
+        if time.time() - self.last_sync < sync_interval:
+            return 0
+        try:
+            return self.sync()
+        except Exception as e:
+            # Keep serving the last synced state if Cosmos DB is unreachable
+            logger.warning(f"Local replica sync failed, serving stale data: {str(e)}")
+            return 0
+
+
+_replica: Optional[CosmosReplica] = None
+
+
+def get_replica() -> CosmosReplica:
+    """Get the process-wide replica, catching up on the change feed first."""
+    global _replica
+    if _replica is None:
+        _replica = CosmosReplica()
+    _replica.maybe_sync()
+    return _replica
+
+
+def cache_scope() -> str:
+    """Retrieval cache scope: changes from the change feed move the token."""
+    continuation = _replica.continuation if _replica is not None else None
+    return (
+        f"replica:{cosmosdb_vector_store.database_name}/"
+        f"{cosmosdb_vector_store.container_name}:{continuation}"
+    )
+
+
+def rebuild() -> int:
+    """Drop the local replica and re-read the whole container."""
+    global _replica
+    replica = CosmosReplica()
+    replica.store = simple_vector_store.create_empty(
+        cosmosdb_vector_store.index_dimensions, replica.embeddings
+    )
+    replica.continuation = None
+    count = replica.sync()
+    _replica = replica
+    return count
+
+
+if __name__ == "__main__":
+    try:
+        if len(sys.argv) > 1 and sys.argv[1] == "--rebuild":
+            count = rebuild()
+        else:
+            count = CosmosReplica().sync()
+        print(f"Local replica synced: {count} documents applied")
+    except Exception as e:
+        logger.error(f"Local replica sync failed: {str(e)}")
+        print(f"Error: {str(e)}")
+        sys.exit(1)
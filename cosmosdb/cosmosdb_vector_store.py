@@ -1,41 +1,45 @@
-from langchain_ollama import OllamaEmbeddings
-from azure.cosmos import CosmosClient, PartitionKey
-from langchain_azure_ai.vectorstores.azure_cosmos_db_no_sql import (
-    AzureCosmosDBNoSqlVectorSearch,
-)
-from azure.identity import DefaultAzureCredential
+import sys
 import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", "simple"))
+
+import embedding_reduction
+import ollama_clients
 import logging
-import urllib3
+from typing import List
 
 # Set up logging
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
-# Validate required environment variables
+# The Azure SDKs, langchain and the Ollama client are imported inside the
+# functions below so that importing this module (e.g. for `--help`) stays cheap.
 required_env_vars = ["DATABASE_NAME", "CONTAINER_NAME", "EMBEDDINGS_MODEL"]
-missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
-if missing_vars:
-    raise ValueError(
-        f"Missing required environment variables: {', '.join(missing_vars)}"
-    )
 
-# Check for COSMOS_DB_URL only if not using emulator
+database_name = os.environ.get("DATABASE_NAME")
+container_name = os.environ.get("CONTAINER_NAME")
 use_emulator = os.environ.get("USE_EMULATOR", "false").lower() == "true"
-if not use_emulator and not os.environ.get("COSMOS_DB_URL"):
-    raise ValueError(
-        "Missing required environment variable: COSMOS_DB_URL (or set USE_EMULATOR=true)"
-    )
-
-database_name = os.environ["DATABASE_NAME"]
-container_name = os.environ["CONTAINER_NAME"]
-partition_key = PartitionKey(path="/id")
+partition_key_path = "/id"
 # ollama embedding models - https://ollama.com/search?c=embedding
-embeddings_model_name = os.environ["EMBEDDINGS_MODEL"]
+embeddings_model_name = os.environ.get("EMBEDDINGS_MODEL")
 # Get embedding dimensions from environment variable with default
 embedding_dimensions = int(os.environ.get("DIMENSIONS", os.environ.get("EMBEDDING_DIMENSIONS", "1024")))
+# Width of the stored vectors after any EMBEDDING_REDUCTION
+index_dimensions = embedding_reduction.index_dimensions(embedding_dimensions)
+# Local files that describe the container (PCA projection, index version,
+# directory-load manifest) and must be seen by every loader and reader;
+# defaults to the repository root rather than the working directory, point it
+# at shared storage when they run on other hosts
+state_dir = os.environ.get(
+    "COSMOS_STATE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+)
+# PCA projection for EMBEDDING_REDUCTION=pca, fitted on the first load
+pca_path = os.path.join(state_dir, f".cosmos_pca_{database_name}_{container_name}.npz")
+# Bumped by the loaders so cached retrieval results for older data expire
+index_version_path = os.path.join(state_dir, f".cosmos_index_version_{database_name}_{container_name}")
+# Files and chunk ids of `load_data.py --dir` runs
+manifest_path = os.path.join(state_dir, f".cosmos_manifest_{database_name}_{container_name}.json")
 
-cosmos_container_properties = {"partition_key": partition_key, "offer_throughput": 1000}
+cosmos_container_offer_throughput = 1000
 
 indexing_policy = {
     "indexingMode": "consistent",
@@ -50,7 +54,7 @@ vector_embedding_policy = {
             "path": "/embedding",
             "dataType": "float32",
             "distanceFunction": "cosine",
-            "dimensions": embedding_dimensions,
+            "dimensions": index_dimensions,
         }
     ]
 }
@@ -60,30 +64,119 @@ embedding_key = "embedding"
 metadata_key = "metadata"
 
 
-def get_instance(create_container: bool = False) -> AzureCosmosDBNoSqlVectorSearch:
+def validate_env() -> None:
+    """Raise if a required environment variable is missing."""
+    missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
+    if missing_vars:
+        raise ValueError(
+            f"Missing required environment variables: {', '.join(missing_vars)}"
+        )
+
+    # Check for COSMOS_DB_URL only if not using emulator
+    if not use_emulator and not os.environ.get("COSMOS_DB_URL"):
+        raise ValueError(
+            "Missing required environment variable: COSMOS_DB_URL (or set USE_EMULATOR=true)"
+        )
+
+
+def get_cosmos_client():
+    """Create a CosmosClient for the emulator or the configured cloud account."""
+    validate_env()
+    from azure.cosmos import CosmosClient
+
+    if use_emulator:
+        import urllib3
+
+        logger.info("Using Cosmos DB Emulator")
+        # Only disable SSL warnings for emulator connections
+        urllib3.disable_warnings()
+
+        return CosmosClient(
+            "https://127.0.0.1:8081/",
+            "C2y6yDjf5/R+ob0N8A7Cgv30VRDJIWEHLM+4QDU5DE2nQ9nDuVTqobD4b8mGGyPMbIZnqyMsEcaGQy67XIw/Jw==",
+            connection_verify=False
+        )
+
+    from azure.identity import DefaultAzureCredential
+
+    cosmos_db_url = os.environ["COSMOS_DB_URL"]
+    return CosmosClient(cosmos_db_url, credential=DefaultAzureCredential())
+
+
+def get_container():
+    """Get the container client for the configured database and container."""
+    client = get_cosmos_client()
+    return client.get_database_client(database_name).get_container_client(container_name)
+
+
+def cache_scope() -> str:
+    """Retrieval cache scope for the current version of the container."""
+    import retrieval_cache
+
+    version = retrieval_cache.read_index_version(index_version_path)
+    return f"cosmos:{database_name}/{container_name}:{version}"
+
+
+def get_embeddings():
+    """Create the Ollama embeddings client, with any configured reduction applied."""
+    validate_env()
+
+    return embedding_reduction.wrap(ollama_clients.get_embeddings(embeddings_model_name), pca_path)
+
+
+def upsert_documents(container, documents: list, ids: List[str], embeddings, batch_size: int = 256) -> None:
+    """Embed and upsert documents under the given ids.
+
+    The langchain store only creates items, which conflicts with the ids of
+    chunks that are being replaced.
+    """
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        vectors = embeddings.embed_documents([doc.page_content for doc in batch])
+        for doc, doc_id, vector in zip(batch, ids[start:start + batch_size], vectors):
+            container.upsert_item({
+                "id": doc_id,
+                text_key: doc.page_content,
+                embedding_key: vector,
+                metadata_key: doc.metadata,
+            })
+
+
+def delete_documents(container, ids: List[str]) -> int:
+    """Delete items by id (the partition key); returns how many existed."""
+    from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+    deleted = 0
+    for doc_id in ids:
+        try:
+            container.delete_item(doc_id, partition_key=doc_id)
+            deleted += 1
+        except CosmosResourceNotFoundError:
+            logger.debug(f"Chunk {doc_id} was already deleted")
+    return deleted
+
+
+def get_instance(create_container: bool = False, embeddings=None):
+    """Get an AzureCosmosDBNoSqlVectorSearch instance for the configured container."""
+    validate_env()
     logger.info(f"Using database: {database_name}, container: {container_name}")
     logger.info(
         f"Using embedding model: {embeddings_model_name} with dimensions: {embedding_dimensions}"
     )
+    if embedding_reduction.enabled():
+        logger.info(
+            f"Reducing embeddings to {index_dimensions} dimensions with {embedding_reduction.reduction_method}"
+        )
 
     try:
-        if use_emulator:
-            logger.info("Using Cosmos DB Emulator")
-            # Only disable SSL warnings for emulator connections
-            urllib3.disable_warnings()
-            
-            cosmos_client = CosmosClient(
-                "https://127.0.0.1:8081/",
-                "C2y6yDjf5/R+ob0N8A7Cgv30VRDJIWEHLM+4QDU5DE2nQ9nDuVTqobD4b8mGGyPMbIZnqyMsEcaGQy67XIw/Jw==",
-                connection_verify=False
-            )
-        else:
-            cosmos_db_url = os.environ["COSMOS_DB_URL"]
-            cosmos_client = CosmosClient(
-                cosmos_db_url, credential=DefaultAzureCredential()
-            )
-
-        embeddings = OllamaEmbeddings(model=embeddings_model_name)
+        from azure.cosmos import PartitionKey
+        from langchain_azure_ai.vectorstores.azure_cosmos_db_no_sql import (
+            AzureCosmosDBNoSqlVectorSearch,
+        )
+
+        cosmos_client = get_cosmos_client()
+        if embeddings is None:
+            embeddings = get_embeddings()
 
         store = AzureCosmosDBNoSqlVectorSearch(
             database_name=database_name,
@@ -98,7 +191,10 @@ def get_instance(create_container: bool = False) -> AzureCosmosDBNoSqlVectorSear
             create_container=create_container,
             indexing_policy=indexing_policy,
             vector_embedding_policy=vector_embedding_policy,
-            cosmos_container_properties=cosmos_container_properties,
+            cosmos_container_properties={
+                "partition_key": PartitionKey(path=partition_key_path),
+                "offer_throughput": cosmos_container_offer_throughput,
+            },
             cosmos_database_properties={},
             full_text_search_enabled=False,
         )
@@ -110,4 +206,4 @@ def get_instance(create_container: bool = False) -> AzureCosmosDBNoSqlVectorSear
         logger.error(
             f"Failed to create AzureCosmosDBNoSqlVectorSearch instance: {str(e)}"
         )
-        raise
\ No newline at end of file
+        raise
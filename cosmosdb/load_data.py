@@ -1,12 +1,15 @@
 import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", "simple"))
 
-from langchain_text_splitters import MarkdownTextSplitter
-from langchain_community.document_loaders import WebBaseLoader
 import cosmosdb_vector_store
+import local_directory_loader
+import chunk_dedup
+import embedding_reduction
+import retrieval_cache
 import logging
-from typing import List
+from typing import List, Optional
 
 # Set up logging
 logging.basicConfig(level=logging.WARNING)
@@ -15,6 +18,8 @@ logger = logging.getLogger(__name__)
 
 def load(urls: List[str], create_container: bool = True) -> None:
     """Load documents from URLs into Azure Cosmos DB vector store."""
+    from langchain_text_splitters import MarkdownTextSplitter
+    from langchain_community.document_loaders import WebBaseLoader
 
     print("Uploading documents to Azure Cosmos DB", urls)
 
@@ -33,9 +38,19 @@ def load(urls: List[str], create_container: bool = True) -> None:
         if not split_docs:
             raise ValueError("No document chunks were created after splitting")
 
+        # Embed boilerplate repeated across pages only once
+        split_docs, _, dedup_stats = chunk_dedup.deduplicate(split_docs)
+        print(f"Chunk dedup: {dedup_stats}")
+
+        # Fit a PCA reduction on the first load; later loads reuse it so
+        # vectors already in the container stay comparable
+        embeddings = cosmosdb_vector_store.get_embeddings()
+        embedding_reduction.fit_if_needed(embeddings, [doc.page_content for doc in split_docs])
+
         # Get vector store instance and add documents
-        store = cosmosdb_vector_store.get_instance(create_container)
+        store = cosmosdb_vector_store.get_instance(create_container, embeddings)
         store.add_documents(split_docs)
+        retrieval_cache.bump_index_version(cosmosdb_vector_store.index_version_path)
 
         print(
             f"Loading {len(split_docs)} document chunks from {len(documents)} documents"
@@ -47,7 +62,51 @@ def load(urls: List[str], create_container: bool = True) -> None:
         raise
 
 
+def load_directory(path: str, create_container: bool = True, manifest_path: Optional[str] = None,
+                   max_workers: Optional[int] = None) -> None:
+    """Incrementally load a local markdown/HTML directory into Azure Cosmos DB."""
+
+    print("Uploading documents from directory to Azure Cosmos DB", path)
+    if manifest_path is None:
+        manifest_path = cosmosdb_vector_store.manifest_path
+
+    try:
+        changes = local_directory_loader.load_changed_chunks(
+            path, manifest_path, max_workers=max_workers
+        )
+
+        embeddings = cosmosdb_vector_store.get_embeddings()
+        embedding_reduction.fit_if_needed(embeddings, [doc.page_content for doc in changes.documents])
+        # Creates the container if needed; items are written to it directly
+        store = cosmosdb_vector_store.get_instance(create_container, embeddings)
+        container = store._container
+
+        cosmosdb_vector_store.delete_documents(container, changes.stale_ids)
+        if changes.documents:
+            # Changed files reuse their chunk ids, so upsert rather than create
+            cosmosdb_vector_store.upsert_documents(container, changes.documents, changes.ids, embeddings)
+        if changes.documents or changes.stale_ids:
+            retrieval_cache.bump_index_version(cosmosdb_vector_store.index_version_path)
+
+        local_directory_loader.save_manifest(manifest_path, changes.manifest)
+        print(
+            f"{changes.changed_files} changed, {changes.unchanged_files} unchanged, "
+            f"{changes.removed_files} removed files; added {len(changes.documents)} chunks, "
+            f"deleted {len(changes.stale_ids)} chunks"
+        )
+        print(f"Chunk dedup: {changes.dedup_stats}")
+        print("Data loaded into Azure Cosmos DB")
+
+    except Exception as e:
+        logger.error(f"Error during directory loading: {str(e)}")
+        raise
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--dir":
+        load_directory(sys.argv[2])
+        sys.exit(0)
+
     doc_urls = [
         "https://raw.githubusercontent.com/MicrosoftDocs/azure-databases-docs/refs/heads/main/articles/cosmos-db/nosql/vector-search.md",
         "https://raw.githubusercontent.com/MicrosoftDocs/azure-databases-docs/refs/heads/main/articles/cosmos-db/nosql/multi-tenancy-vector-search.md",
@@ -0,0 +1,341 @@
+"""Move chunks and their stored vectors between the FAISS store and Cosmos DB.
+
+Copies text, metadata, ids and embeddings as they are, so promoting the local
+FAISS corpus to a Cosmos DB container (or pulling a container down for
+offline use) needs no Ollama calls. The embedding model, reduction and vector
+width of the source are checked against the target configuration first; a
+PCA projection travels with the vectors.
+
+Usage:
+  python cosmosdb/migrate_vectors.py faiss-to-cosmos [--store ./vector_store]
+  python cosmosdb/migrate_vectors.py cosmos-to-faiss [--store ./vector_store]
+  python cosmosdb/migrate_vectors.py export faiss|cosmos chunks.jsonl.gz
+  python cosmosdb/migrate_vectors.py import faiss|cosmos chunks.jsonl.gz
+
+Export files are JSONL (gzip-compressed when the name ends in .gz): one
+header line with the embedding settings, then one line per chunk.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", "simple"))
+
+import cosmosdb_vector_store
+import simple_vector_store
+import embedding_reduction
+import retrieval_cache
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+Records = Iterator[Dict]
+
+
+def _read_pca(path: str) -> Optional[Dict]:
+    import numpy as np
+
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {"mean": data["mean"].tolist(), "components": data["components"].tolist()}
+
+
+def _write_pca(path: str, pca: Dict) -> None:
+    import numpy as np
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, mean=np.asarray(pca["mean"], dtype=np.float32),
+             components=np.asarray(pca["components"], dtype=np.float32))
+
+
+def _container_dimensions(container) -> Optional[int]:
+    """Vector width in the container's embedding policy, or None if it does not exist."""
+    from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+    try:
+        properties = container.read()
+    except CosmosResourceNotFoundError:
+        return None
+    for policy in properties.get("vectorEmbeddingPolicy", {}).get("vectorEmbeddings", []):
+        if policy.get("path") == f"/{cosmosdb_vector_store.embedding_key}":
+            return policy.get("dimensions")
+    return None
+
+
+def check_compatible(source: Dict, expected: Dict) -> None:
+    """Raise if vectors described by source cannot be searched with the target settings."""
+    problems = []
+    if source.get("embeddings_model") is None:
+        logger.warning("Source does not record its embedding model; assuming EMBEDDINGS_MODEL")
+    elif source["embeddings_model"] != expected["embeddings_model"]:
+        problems.append(
+            f"embedding model {source['embeddings_model']} (target uses {expected['embeddings_model']})"
+        )
+    if source.get("reduction", "none") != expected["reduction"]:
+        problems.append(
+            f"reduction {source.get('reduction', 'none')} (target uses {expected['reduction']})"
+        )
+    if expected.get("dimensions") is not None and source["dimensions"] != expected["dimensions"]:
+        problems.append(f"{source['dimensions']} dimensions (target expects {expected['dimensions']})")
+    if expected["reduction"] == "pca" and not source.get("pca"):
+        problems.append("no PCA projection")
+    if problems:
+        raise ValueError("Incompatible source vectors: " + "; ".join(problems))
+
+
+def faiss_source(path: str, batch_size: int) -> Tuple[Dict, Records]:
+    """Embedding settings and chunk records of a saved FAISS store."""
+    store = simple_vector_store.load_local(path)
+    info = simple_vector_store.read_embedding_info(path) or {
+        "embeddings_model": None,
+        "reduction": embedding_reduction.reduction_method,
+    }
+    info["dimensions"] = store.index.d
+    info["pca"] = _read_pca(os.path.join(path, simple_vector_store.PCA_FILE)) if info["reduction"] == "pca" else None
+
+    def records() -> Records:
+        for start in range(0, store.index.ntotal, batch_size):
+            count = min(batch_size, store.index.ntotal - start)
+            vectors = store.index.reconstruct_n(start, count)
+            for offset, vector in enumerate(vectors):
+                doc_id = store.index_to_docstore_id[start + offset]
+                doc = store.docstore.search(doc_id)
+                yield {"id": doc_id, "text": doc.page_content, "metadata": doc.metadata,
+                       "embedding": vector.tolist()}
+
+    return info, records()
+
+
+def cosmos_source(batch_size: int) -> Tuple[Dict, Records]:
+    """Embedding settings and chunk records of the configured Cosmos DB container."""
+    container = cosmosdb_vector_store.get_container()
+    dimensions = _container_dimensions(container)
+    if dimensions is None:
+        raise ValueError(
+            f"Container {cosmosdb_vector_store.container_name} does not exist or has no vector policy"
+        )
+    info = {
+        "embeddings_model": cosmosdb_vector_store.embeddings_model_name,
+        "reduction": embedding_reduction.reduction_method,
+        "dimensions": dimensions,
+        "pca": _read_pca(cosmosdb_vector_store.pca_path) if embedding_reduction.reduction_method == "pca" else None,
+    }
+
+    text_key = cosmosdb_vector_store.text_key
+    metadata_key = cosmosdb_vector_store.metadata_key
+    embedding_key = cosmosdb_vector_store.embedding_key
+
+    def records() -> Records:
+        items = container.query_items(
+            query=(
+                f"SELECT c.id, c[\"{text_key}\"] AS text, c[\"{metadata_key}\"] AS metadata, "
+                f"c[\"{embedding_key}\"] AS embedding FROM c"
+            ),
+            enable_cross_partition_query=True,
+            max_item_count=batch_size,
+        )
+        for item in items:
+            if item.get("embedding") is None:
+                continue
+            yield {"id": item["id"], "text": item.get("text") or "",
+                   "metadata": item.get("metadata") or {}, "embedding": item["embedding"]}
+
+    return info, records()
+
+
+def _batches(records: Records, info: Dict, batch_size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        if len(record["embedding"]) != info["dimensions"]:
+            raise ValueError(
+                f"Chunk {record['id']} has {len(record['embedding'])} dimensions, expected {info['dimensions']}"
+            )
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def faiss_target(path: str, info: Dict, records: Records, batch_size: int) -> int:
+    """Replace the FAISS store at path with the given records."""
+    expected = {
+        "embeddings_model": os.environ.get("EMBEDDINGS_MODEL"),
+        "reduction": embedding_reduction.reduction_method,
+        "dimensions": embedding_reduction.reduced_dimensions if embedding_reduction.enabled() else None,
+    }
+    check_compatible(info, expected)
+
+    if info.get("pca"):
+        _write_pca(os.path.join(path, simple_vector_store.PCA_FILE), info["pca"])
+    store = simple_vector_store.create_empty(info["dimensions"], simple_vector_store.get_embeddings(path))
+
+    count = 0
+    for batch in _batches(records, info, batch_size):
+        store.add_embeddings(
+            text_embeddings=[(r["text"], r["embedding"]) for r in batch],
+            metadatas=[r["metadata"] for r in batch],
+            ids=[r["id"] for r in batch],
+        )
+        count += len(batch)
+        print(f"  {count} chunks")
+
+    simple_vector_store.save_local(store, path)
+    simple_vector_store.save_embedding_info(path, info["dimensions"])
+    retrieval_cache.bump_index_version(os.path.join(path, "index_version"))
+    # The store was rebuilt, so a local directory manifest no longer applies
+    manifest_path = os.path.join(path, "local_manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    return count
+
+
+def cosmos_target(info: Dict, records: Records, batch_size: int, workers: int) -> int:
+    """Upsert the given records into the configured Cosmos DB container."""
+    import numpy as np
+
+    expected = {
+        "embeddings_model": cosmosdb_vector_store.embeddings_model_name,
+        "reduction": embedding_reduction.reduction_method,
+        "dimensions": cosmosdb_vector_store.index_dimensions,
+    }
+    check_compatible(info, expected)
+
+    # Creates the container with the vector policy if needed; nothing is embedded
+    store = cosmosdb_vector_store.get_instance(create_container=True)
+    container = store._container
+    dimensions = _container_dimensions(container)
+    if dimensions is not None and dimensions != info["dimensions"]:
+        raise ValueError(
+            f"Container vector policy has {dimensions} dimensions, source vectors have {info['dimensions']}"
+        )
+
+    if info.get("pca"):
+        existing = _read_pca(cosmosdb_vector_store.pca_path)
+        if existing is not None and not np.allclose(existing["components"], info["pca"]["components"]):
+            raise ValueError(
+                f"{cosmosdb_vector_store.pca_path} holds a different PCA projection; vectors already in "
+                "the container would not be comparable with the imported ones"
+            )
+        _write_pca(cosmosdb_vector_store.pca_path, info["pca"])
+
+    def upsert(record: Dict) -> None:
+        container.upsert_item({
+            "id": record["id"],
+            cosmosdb_vector_store.text_key: record["text"],
+            cosmosdb_vector_store.embedding_key: record["embedding"],
+            cosmosdb_vector_store.metadata_key: record["metadata"],
+        })
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in _batches(records, info, batch_size):
+            list(pool.map(upsert, batch))
+            count += len(batch)
+            print(f"  {count} chunks")
+
+    if count:
+        retrieval_cache.bump_index_version(cosmosdb_vector_store.index_version_path)
+    return count
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        import gzip
+
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_export(path: str, info: Dict, records: Records) -> int:
+    """Write a header line and one JSON line per chunk."""
+    count = 0
+    with _open(path, "w") as f:
+        f.write(json.dumps(dict(info, format_version=FORMAT_VERSION)) + "\n")
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+def read_export(path: str) -> Tuple[Dict, Records]:
+    """Embedding settings and chunk records of a file written by write_export()."""
+    with _open(path, "r") as f:
+        info = json.loads(f.readline())
+    if info.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a vector export (format version {info.get('format_version')})")
+
+    def records() -> Records:
+        with _open(path, "r") as f:
+            f.readline()
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return info, records()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Move chunks and stored vectors between FAISS and Cosmos DB")
+    parser.add_argument("--store", default="./vector_store", help="FAISS store directory")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent Cosmos DB upserts")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("faiss-to-cosmos", help="Copy the FAISS store into the Cosmos DB container")
+    commands.add_parser("cosmos-to-faiss", help="Replace the FAISS store with the Cosmos DB container")
+    export = commands.add_parser("export", help="Write a backend to a JSONL file")
+    export.add_argument("backend", choices=["faiss", "cosmos"])
+    export.add_argument("path")
+    import_ = commands.add_parser("import", help="Load a JSONL export into a backend")
+    import_.add_argument("backend", choices=["faiss", "cosmos"])
+    import_.add_argument("path")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    start = time.perf_counter()
+
+    if args.command == "faiss-to-cosmos":
+        info, records = faiss_source(args.store, args.batch_size)
+        count = cosmos_target(info, records, args.batch_size, args.workers)
+    elif args.command == "cosmos-to-faiss":
+        info, records = cosmos_source(args.batch_size)
+        count = faiss_target(args.store, info, records, args.batch_size)
+    elif args.command == "export":
+        if args.backend == "faiss":
+            info, records = faiss_source(args.store, args.batch_size)
+        else:
+            info, records = cosmos_source(args.batch_size)
+        count = write_export(args.path, info, records)
+    else:
+        info, records = read_export(args.path)
+        if args.backend == "faiss":
+            count = faiss_target(args.store, info, records, args.batch_size)
+        else:
+            count = cosmos_target(info, records, args.batch_size, args.workers)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Migrated {count} chunks ({info['dimensions']} dimensions, {info.get('embeddings_model')}) "
+        f"in {elapsed:.1f} s, no re-embedding"
+    )
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        logger.error(f"Vector migration failed: {str(e)}")
+        print(f"Error: {str(e)}")
+        sys.exit(1)
@@ -1,24 +1,49 @@
 import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", "simple"))
 
 import cosmosdb_vector_store
+import cosmos_replica
+import filtered_search
+import retrieval_cache
 import sys
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 # Set up logging
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
 
-def search_vectors(query: str, top_k: int = 5) -> List[Tuple]:
-    """Perform vector similarity search."""
+def search_vectors(query: str, top_k: int = 5,
+                   conditions: Optional[List[filtered_search.Condition]] = None) -> List[Tuple]:
+    """Perform vector similarity search, optionally restricted by metadata filters."""
     try:
         print(f'Searching top {top_k} results for query: "{query}"\n')
 
-        store = cosmosdb_vector_store.get_instance()
-        results = store.similarity_search_with_score(query=query, k=top_k)
+        if cosmos_replica.replica_enabled:
+            cosmos_replica.get_replica()
+            scope = cosmos_replica.cache_scope()
+        else:
+            scope = cosmosdb_vector_store.cache_scope()
+
+        def search():
+            # Only connect to Cosmos DB on a cache miss
+            if cosmos_replica.replica_enabled:
+                replica = cosmos_replica.get_replica()
+                store, embeddings = replica.store, replica.embeddings
+            else:
+                embeddings = cosmosdb_vector_store.get_embeddings()
+                store = cosmosdb_vector_store.get_instance(embeddings=embeddings)
+
+            if conditions:
+                # Filters go into the Cosmos DB WHERE clause (or FAISS id selector)
+                vector = embeddings.embed_query(query)
+                return filtered_search.search_by_vector(store, vector, top_k, conditions)
+            return store.similarity_search_with_score(query=query, k=top_k)
+
+        results = retrieval_cache.cached_search(scope, query, top_k, conditions, search)
 
         if not results:
             print("No results found for the query.")
@@ -38,26 +63,32 @@ def search_vectors(query: str, top_k: int = 5) -> List[Tuple]:
 
 def main():
     """Main function to handle command line arguments and execute search."""
-    if len(sys.argv) < 2:
-        print("Usage: python vector_search.py <query> [top_k]")
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print("Usage: python vector_search.py <query> [top_k] [--filter <field><op><value> ...]")
         print("Example: python vector_search.py 'How does a vector store work?' 10")
-        sys.exit(1)
+        print("Example: python vector_search.py 'vector index' --filter source=docs/a.md --filter 'date>=2024-01-01'")
+        print("Filters match exact values; URL-loaded chunks have the full URL as source")
+        sys.exit(0 if len(sys.argv) > 1 else 1)
 
     try:
-        query = sys.argv[1]
+        argv, conditions = filtered_search.pop_filter_args(sys.argv[1:])
+        if not argv:
+            print("Error: missing query")
+            sys.exit(1)
+        query = argv[0]
 
         # Optional second argument for top_k
         top_k = 5  # default
-        if len(sys.argv) > 2:
+        if len(argv) > 1:
             try:
-                top_k = int(sys.argv[2])
+                top_k = int(argv[1])
                 if top_k <= 0:
                     raise ValueError("top_k must be a positive integer")
             except ValueError as e:
-                print(f"Invalid top_k value: {sys.argv[2]}. Using default value of 5.")
+                print(f"Invalid top_k value: {argv[1]}. Using default value of 5.")
                 top_k = 5
 
-        search_vectors(query, top_k)
+        search_vectors(query, top_k, conditions)
 
     except Exception as e:
         logger.error(f"Application error: {str(e)}")
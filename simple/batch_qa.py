@@ -0,0 +1,212 @@
+"""Batch question answering over a vector store.
+
+Reads questions from JSONL, embeds them in batches, runs the vector searches
+concurrently, keeps a bounded number of LLM requests in flight and streams
+one JSON line per answer (with sources and timings) to the output file.
+Questions already present in the output are skipped, so an interrupted run
+resumes where it stopped. `cosmosdb/cosmos_batch_qa.py` reuses this with
+the Cosmos DB store.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import rerank
+from filtered_search import Condition, parse_filter, search_by_vector
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# Questions embedded and searched together; generation of one window
+# overlaps with retrieval of the next
+batch_size = int(os.environ.get("BATCH_SIZE", "32"))
+max_search_workers = int(os.environ.get("BATCH_SEARCH_WORKERS", "8"))
+max_in_flight = int(os.environ.get("BATCH_MAX_IN_FLIGHT", "4"))
+
+
+def read_questions(path: str) -> List[Dict]:
+    """Read {"id": ..., "question": ...} records; ids default to the line number."""
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"question": record}
+            record.setdefault("id", line_number)
+            questions.append(record)
+    return questions
+
+
+def read_completed_ids(path: str) -> Set[str]:
+    """Ids already answered in an existing output file (for resuming)."""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line of an interrupted run may be truncated
+                continue
+            if "error" not in record:
+                completed.add(str(record["id"]))
+    return completed
+
+
+def _timed_search(store, question: str, vector: List[float], k: int,
+                  conditions: Optional[List[Condition]]) -> Tuple[List[Tuple], Dict[str, float]]:
+    start = time.perf_counter()
+    # Cosmos DB returns the candidates' stored vectors with the search
+    vectors = {} if rerank.rerank_enabled else None
+    results = search_by_vector(store, vector, rerank.candidate_count(k), conditions, vectors)
+    timing = {"search_ms": (time.perf_counter() - start) * 1000}
+    if rerank.rerank_enabled:
+        start = time.perf_counter()
+        scores = {id(doc): score for doc, score in results}
+        docs = rerank.rerank(store, [question], [vector], [doc for doc, _ in results], k, vectors)
+        results = [(doc, scores[id(doc)]) for doc in docs]
+        timing["rerank_ms"] = (time.perf_counter() - start) * 1000
+    return results, timing
+
+
+def run_batch(
+    questions_path: str,
+    output_path: str,
+    store,
+    embeddings,
+    llm,
+    build_prompt: Callable[[str, list], str],
+    top_k: int = 5,
+    conditions: Optional[List[Condition]] = None,
+) -> int:
+    """Answer every unanswered question in questions_path; returns records written."""
+    questions = read_questions(questions_path)
+    completed = read_completed_ids(output_path)
+    pending = [q for q in questions if str(q["id"]) not in completed]
+    print(f"{len(questions)} questions, {len(completed)} already answered, {len(pending)} to go")
+
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+    write_lock = threading.Lock()
+    answered = [0]
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max_search_workers) as search_pool, \
+            ThreadPoolExecutor(max_workers=max_in_flight) as generate_pool:
+
+        def write(record: Dict) -> None:
+            with write_lock:
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                answered[0] += 1
+
+        def generate(question: Dict, results: List[Tuple], timing: Dict[str, float]) -> None:
+            try:
+                start = time.perf_counter()
+                docs = [doc for doc, _ in results]
+                response = llm.invoke(build_prompt(question["question"], docs))
+                timing["generate_ms"] = (time.perf_counter() - start) * 1000
+                timing["total_ms"] = sum(timing.values())
+                write({
+                    "id": question["id"],
+                    "question": question["question"],
+                    "answer": response.content if hasattr(response, "content") else str(response),
+                    "sources": [
+                        # FAISS scores are numpy.float32, which json cannot encode
+                        {"source": doc.metadata.get("source"),
+                         "score": None if score is None else float(score)}
+                        for doc, score in results
+                    ],
+                    "timing": {name: round(ms, 1) for name, ms in timing.items()},
+                })
+            except Exception as e:
+                logger.error(f"Error answering question {question['id']}: {str(e)}")
+                write({"id": question["id"], "question": question["question"], "error": str(e)})
+            finally:
+                in_flight.release()
+
+        for start_index in range(0, len(pending), batch_size):
+            window = pending[start_index:start_index + batch_size]
+
+            # One batched embedding call for the whole window
+            start = time.perf_counter()
+            vectors = embeddings.embed_documents([q["question"] for q in window])
+            embed_ms = (time.perf_counter() - start) * 1000 / len(window)
+
+            searches = [
+                search_pool.submit(_timed_search, store, q["question"], v, top_k, conditions)
+                for q, v in zip(window, vectors)
+            ]
+
+            for question, search in zip(window, searches):
+                try:
+                    results, search_timing = search.result()
+                except Exception as e:
+                    logger.error(f"Error retrieving for question {question['id']}: {str(e)}")
+                    write({"id": question["id"], "question": question["question"], "error": str(e)})
+                    continue
+                timing = {"embed_ms": embed_ms, **search_timing}
+                # Blocks while max_in_flight generations are running
+                in_flight.acquire()
+                generate_pool.submit(generate, question, results, timing)
+
+    return answered[0]
+
+
+def parse_args(description: str) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("questions", help="Input JSONL with one {\"id\", \"question\"} per line")
+    parser.add_argument("output", help="Output JSONL; existing answers are kept and skipped")
+    parser.add_argument("--top-k", type=int, default=int(os.environ.get("TOP_K", "5")))
+    parser.add_argument("--filter", dest="filters", action="append", default=[], type=parse_filter,
+                        help="Metadata filter such as 'source=docs/a.md' or 'date>=2024-01-01'; repeatable")
+    return parser.parse_args()
+
+
+def main():
+    """Batch RAG over the saved FAISS store."""
+    args = parse_args("Answer questions from a JSONL file using the FAISS store.")
+
+    try:
+        import simple_rag_chain
+        import simple_vector_store
+        import ollama_clients
+
+        simple_rag_chain.validate_env()
+        embeddings = simple_vector_store.get_embeddings()
+        store = simple_vector_store.load_local("./vector_store", embeddings)
+        llm = ollama_clients.get_chat_model(simple_rag_chain.chat_model)
+        ollama_clients.warm_up(os.environ["EMBEDDINGS_MODEL"], simple_rag_chain.chat_model)
+
+        count = run_batch(
+            args.questions,
+            args.output,
+            store,
+            embeddings,
+            llm,
+            simple_rag_chain.build_prompt,
+            top_k=args.top_k,
+            conditions=args.filters,
+        )
+        print(f"Wrote {count} records to {args.output}")
+
+    except Exception as e:
+        logger.error(f"Batch run failed: {str(e)}")
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
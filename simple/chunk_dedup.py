@@ -0,0 +1,159 @@
+"""Exact and near-duplicate chunk elimination before embedding.
+
+Docs repositories repeat boilerplate (includes, notes, navigation) across
+pages, and the splitter turns every copy into its own chunk. Exact copies are
+found by hashing the whitespace/case-normalised text; near copies by MinHash
+signatures over word shingles, bucketed with LSH and confirmed by the
+estimated Jaccard similarity. One canonical chunk is kept and the sources of
+the dropped copies are listed in its `duplicate_sources` metadata.
+
+Enabled by default; set CHUNK_DEDUP=false to embed every chunk.
+"""
+import os
+import re
+import zlib
+import hashlib
+import logging
+from typing import Dict, List, NamedTuple, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+dedup_enabled = os.environ.get("CHUNK_DEDUP", "true").lower() == "true"
+# Estimated Jaccard similarity of word shingles above which chunks are merged
+dedup_threshold = float(os.environ.get("CHUNK_DEDUP_THRESHOLD", "0.9"))
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Chunks shorter than this (in words) are only merged when identical
+MIN_NEAR_DUP_WORDS = 20
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+class DedupStats(NamedTuple):
+    total: int
+    exact_duplicates: int
+    near_duplicates: int
+
+    @property
+    def kept(self) -> int:
+        return self.total - self.exact_duplicates - self.near_duplicates
+
+    @property
+    def ratio(self) -> float:
+        """Fraction of chunks removed."""
+        return 1 - self.kept / self.total if self.total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.total} chunks -> {self.kept} unique ({self.exact_duplicates} exact and "
+            f"{self.near_duplicates} near duplicates removed, {self.ratio:.1%} dedup ratio)"
+        )
+
+
+def _normalise(text: str) -> str:
+    """Case-folded text with runs of whitespace collapsed; punctuation is kept."""
+    return " ".join(text.lower().split())
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def _permutations():
+    import numpy as np
+
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+def minhash(words: List[str], permutations):
+    """MinHash signature of the word shingles of a chunk."""
+    import numpy as np
+
+    a, b = permutations
+    shingles = {
+        " ".join(words[i:i + SHINGLE_SIZE])
+        for i in range(max(1, len(words) - SHINGLE_SIZE + 1))
+    }
+    hashes = np.array(
+        [zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64
+    ) % np.uint64(MERSENNE_PRIME)
+    # (a * h + b) mod p for every permutation/shingle pair; fits in uint64
+    return ((np.outer(a, hashes) + b[:, None]) % np.uint64(MERSENNE_PRIME)).min(axis=1)
+
+
+def find_duplicates(texts: List[str], threshold: float = dedup_threshold) -> Tuple[List[int], DedupStats]:
+    """Map each text to the index of its canonical (first-seen) copy."""
+    import numpy as np
+
+    permutations = _permutations()
+    canonical: List[int] = []
+    exact: Dict[str, int] = {}
+    buckets: Dict[Tuple[int, bytes], List[int]] = {}
+    signatures: Dict[int, object] = {}
+    exact_count = near_count = 0
+
+    for i, text in enumerate(texts):
+        # Exact copies must match symbols too (`c.x > 1` vs `c.x < 1`); word
+        # tokens are only used for the near-duplicate shingles
+        digest = hashlib.sha256(_normalise(text).encode("utf-8")).hexdigest()
+        if digest in exact:
+            canonical.append(exact[digest])
+            exact_count += 1
+            continue
+
+        words = _words(text)
+        if len(words) < MIN_NEAR_DUP_WORDS:
+            exact[digest] = i
+            canonical.append(i)
+            continue
+
+        signature = minhash(words, permutations)
+        bands = [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+        match = None
+        candidates = {j for key in bands for j in buckets.get(key, ())}
+        for j in sorted(candidates):
+            if np.mean(signatures[j] == signature) >= threshold:
+                match = j
+                break
+
+        if match is not None:
+            canonical.append(match)
+            near_count += 1
+            continue
+
+        exact[digest] = i
+        canonical.append(i)
+        signatures[i] = signature
+        for key in bands:
+            buckets.setdefault(key, []).append(i)
+
+    return canonical, DedupStats(len(texts), exact_count, near_count)
+
+
+def deduplicate(documents: list) -> Tuple[list, List[int], DedupStats]:
+    """Drop duplicate chunks, recording their sources on the canonical chunk.
+
+    Returns (kept documents, canonical index for every input, stats).
+    """
+    if not dedup_enabled or not documents:
+        return documents, list(range(len(documents))), DedupStats(len(documents), 0, 0)
+
+    canonical, stats = find_duplicates([doc.page_content for doc in documents])
+    for i, j in enumerate(canonical):
+        if i != j:
+            reference = {"source": documents[i].metadata.get("source")}
+            if "chunk" in documents[i].metadata:
+                reference["chunk"] = documents[i].metadata["chunk"]
+            documents[j].metadata.setdefault("duplicate_sources", []).append(reference)
+
+    kept = [doc for i, doc in enumerate(documents) if canonical[i] == i]
+    logger.info(f"Chunk dedup: {stats}")
+    return kept, canonical, stats
@@ -0,0 +1,159 @@
+"""Optional embedding dimension reduction applied at ingest and query time.
+
+EMBEDDING_REDUCTION selects the method:
+- none (default): full-width vectors
+- truncate: keep the first REDUCED_DIMENSIONS components and renormalise
+  (for Matryoshka-trained models such as mxbai-embed-large or nomic-embed-text)
+- pca: project onto REDUCED_DIMENSIONS principal components fitted on the
+  corpus at load time and saved next to the index
+
+Both stores wrap their Ollama embeddings with `wrap()`, so documents and
+queries always go through the same reduction.
+"""
+import os
+import logging
+from typing import Dict, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+reduction_method = os.environ.get("EMBEDDING_REDUCTION", "none").lower()
+reduced_dimensions = int(os.environ.get("REDUCED_DIMENSIONS", "256"))
+
+METHODS = ("none", "truncate", "pca")
+
+
+def enabled() -> bool:
+    return reduction_method != "none"
+
+
+def index_dimensions(full_dimensions: int) -> int:
+    """Dimensions actually stored in the index for the configured reduction."""
+    return reduced_dimensions if enabled() else full_dimensions
+
+
+def fit_pca(vectors, dimensions: int) -> Dict:
+    """Fit a PCA projection on (n, d) vectors; returns {"mean", "components"}."""
+    import numpy as np
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.shape[0] < dimensions:
+        raise ValueError(
+            f"PCA to {dimensions} dimensions needs at least {dimensions} vectors, got {matrix.shape[0]}"
+        )
+    mean = matrix.mean(axis=0)
+    # Rows of vt are the principal axes, ordered by explained variance
+    _, _, vt = np.linalg.svd(matrix - mean, full_matrices=False)
+    return {"mean": mean, "components": vt[:dimensions]}
+
+
+def reduce(vectors, method: str, dimensions: int, pca: Optional[Dict] = None):
+    """Reduce (n, d) vectors and L2-normalise the result."""
+    import numpy as np
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if method == "truncate":
+        matrix = matrix[:, :dimensions]
+    elif method == "pca":
+        matrix = (matrix - pca["mean"]) @ pca["components"].T
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class ReducedEmbeddings:
+    """Embeddings wrapper that reduces every document and query vector."""
+
+    def __init__(self, base, method: str, dimensions: int, pca_path: str):
+        if method not in METHODS:
+            raise ValueError(f"Unknown EMBEDDING_REDUCTION '{method}', expected one of {METHODS}")
+        self.base = base
+        self.method = method
+        self.dimensions = dimensions
+        self.pca_path = pca_path
+        self.pca: Optional[Dict] = None
+        # Full-width vectors embedded by fit(), reused by the next embed_documents
+        self._fit_cache: Dict[str, List[float]] = {}
+
+    def is_fitted(self) -> bool:
+        if self.method != "pca" or self.pca is not None:
+            return True
+        return self._load_pca()
+
+    def _load_pca(self) -> bool:
+        import numpy as np
+
+        if not os.path.exists(self.pca_path):
+            return False
+        with np.load(self.pca_path) as data:
+            self.pca = {"mean": data["mean"], "components": data["components"]}
+        if self.pca["components"].shape[0] != self.dimensions:
+            raise ValueError(
+                f"PCA model at {self.pca_path} has {self.pca['components'].shape[0]} dimensions, "
+                f"REDUCED_DIMENSIONS is {self.dimensions}; reload the data"
+            )
+        return True
+
+    def fit(self, texts: List[str]) -> None:
+        """Fit and save the PCA projection on the corpus (no-op for truncate).
+
+        The full-width vectors are kept so the following add_documents call
+        does not embed the corpus a second time.
+        """
+        if self.method != "pca":
+            return
+        import numpy as np
+
+        unique_texts = list(dict.fromkeys(texts))
+        vectors = self.base.embed_documents(unique_texts)
+        self._fit_cache = dict(zip(unique_texts, vectors))
+        self.pca = fit_pca(vectors, self.dimensions)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.pca_path)), exist_ok=True)
+        np.savez(self.pca_path, mean=self.pca["mean"], components=self.pca["components"])
+        logger.info(f"Fitted PCA to {self.dimensions} dimensions on {len(unique_texts)} chunks")
+
+    def _reduce(self, vectors) -> List[List[float]]:
+        if not self.is_fitted():
+            raise ValueError(
+                f"EMBEDDING_REDUCTION=pca but no PCA model at {self.pca_path}; load the data first"
+            )
+        return reduce(vectors, self.method, self.dimensions, self.pca).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        missing = list(dict.fromkeys(text for text in texts if text not in self._fit_cache))
+        embedded = dict(zip(missing, self.base.embed_documents(missing))) if missing else {}
+        vectors = [self._fit_cache[text] if text in self._fit_cache else embedded[text] for text in texts]
+        for text in texts:
+            self._fit_cache.pop(text, None)
+        return self._reduce(vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._reduce([self.base.embed_query(text)])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+def fit_if_needed(embeddings, texts: List[str], refit: bool = False) -> None:
+    """Fit a PCA reduction on the corpus before its first load (or on rebuild)."""
+    if not isinstance(embeddings, ReducedEmbeddings):
+        return
+    if refit or not embeddings.is_fitted():
+        embeddings.fit(texts)
+
+
+def wrap(base, pca_path: str):
+    """Wrap base embeddings with the configured reduction (or return them as-is)."""
+    if not enabled():
+        return base
+    from langchain_core.embeddings import Embeddings
+
+    # Registered rather than subclassed so this module stays import-cheap;
+    # vector stores only check isinstance(..., Embeddings)
+    Embeddings.register(ReducedEmbeddings)
+    return ReducedEmbeddings(base, reduction_method, reduced_dimensions, pca_path)
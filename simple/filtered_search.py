@@ -0,0 +1,198 @@
+"""Metadata filters pushed down into the vector search of both backends.
+
+A filter is a list of conditions such as `source=docs/a.md` or
+`date>=2024-01-01` (ANDed together). For Cosmos DB they become a
+parameterised WHERE clause of the vector query; for FAISS they select the
+matching vector ids before the top-k search (faiss IDSelectorBatch). Either
+way the top k is taken among matching chunks, with no over-fetching.
+"""
+import re
+import logging
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# Longest operators first so ">=" is not read as ">"
+OPERATORS = ("!=", ">=", "<=", "=", ">", "<")
+FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+Condition = Tuple[str, str, object]
+
+# FAISS store -> (id map, vector count, [(faiss id, metadata)]), rebuilt on any change
+_metadata_rows: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _parse_value(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def parse_filter(expression: str) -> Condition:
+    """Parse `field<op>value`; `metadata.` prefixes are accepted and dropped."""
+    for operator in OPERATORS:
+        if operator in expression:
+            field, value = expression.split(operator, 1)
+            field = field.strip()
+            if field.startswith("metadata."):
+                field = field[len("metadata."):]
+            if not FIELD_PATTERN.match(field):
+                raise ValueError(f"Invalid filter field: {field!r}")
+            return field, operator, _parse_value(value.strip())
+    raise ValueError(f"Invalid filter {expression!r}, expected field<op>value with op in {OPERATORS}")
+
+
+def parse_filters(expressions: Optional[str]) -> List[Condition]:
+    """Parse a ';'-separated list of filters (e.g. from RAG_FILTER)."""
+    if not expressions:
+        return []
+    return [parse_filter(e) for e in expressions.split(";") if e.strip()]
+
+
+def pop_filter_args(argv: List[str]) -> Tuple[List[str], List[Condition]]:
+    """Split `--filter EXPR` pairs out of a command line."""
+    remaining, conditions = [], []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--filter":
+            conditions.append(parse_filter(next(args, "")))
+        else:
+            remaining.append(arg)
+    return remaining, conditions
+
+
+def _lookup(metadata: Dict, field: str):
+    value = metadata
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _compare(actual, operator: str, expected) -> bool:
+    # Missing fields never match, as in a Cosmos DB WHERE clause
+    if actual is None:
+        return False
+    if isinstance(expected, (int, float)) and not isinstance(actual, (int, float)):
+        actual = _parse_value(str(actual))
+    if isinstance(expected, (int, float)) != isinstance(actual, (int, float)):
+        actual, expected = str(actual), str(expected)
+    if operator == "=":
+        return actual == expected
+    if operator == "!=":
+        return actual != expected
+    if operator == ">=":
+        return actual >= expected
+    if operator == "<=":
+        return actual <= expected
+    if operator == ">":
+        return actual > expected
+    return actual < expected
+
+
+def matches(metadata: Dict, conditions: List[Condition]) -> bool:
+    return all(_compare(_lookup(metadata, f), op, v) for f, op, v in conditions)
+
+
+def cosmos_where(conditions: List[Condition], metadata_key: str = "metadata") -> Tuple[str, List[Dict]]:
+    """Build a parameterised WHERE clause over the item's metadata."""
+    clauses, parameters = [], []
+    for i, (field, operator, value) in enumerate(conditions):
+        path = "".join(f'["{part}"]' for part in field.split("."))
+        clauses.append(f'c["{metadata_key}"]{path} {operator} @p{i}')
+        parameters.append({"name": f"@p{i}", "value": value})
+    return " AND ".join(clauses), parameters
+
+
+def cosmos_search(container, vector: List[float], k: int, conditions: List[Condition],
+                  text_key: str = "text", embedding_key: str = "embedding",
+                  metadata_key: str = "metadata", vectors: Optional[Dict] = None) -> List[Tuple]:
+    """Cosmos DB vector query with the filters in its WHERE clause.
+
+    When a vectors dict is given, the stored embeddings are projected too and
+    collected into it by item id, so a rerank needs no second query.
+    """
+    from langchain_core.documents import Document
+
+    where, parameters = cosmos_where(conditions, metadata_key)
+    projection = f", c[\"{embedding_key}\"] AS embedding" if vectors is not None else ""
+    query = (
+        f"SELECT TOP {int(k)} c.id, c[\"{text_key}\"] AS text, c[\"{metadata_key}\"] AS metadata{projection}, "
+        f"VectorDistance(c[\"{embedding_key}\"], @embedding) AS score FROM c "
+        f"{'WHERE ' + where if where else ''} "
+        f"ORDER BY VectorDistance(c[\"{embedding_key}\"], @embedding)"
+    )
+    parameters.append({"name": "@embedding", "value": list(vector)})
+    items = list(container.query_items(query=query, parameters=parameters, enable_cross_partition_query=True))
+    if vectors is not None:
+        vectors.update((item["id"], item["embedding"]) for item in items if item.get("embedding") is not None)
+    return [
+        (Document(page_content=item.get("text") or "", metadata=item.get("metadata") or {}, id=item["id"]),
+         item["score"])
+        for item in items
+    ]
+
+
+def _faiss_rows(store) -> List[Tuple[int, Dict]]:
+    # FAISS.delete() renumbers positions and replaces index_to_docstore_id,
+    # adds grow the index, so either change invalidates the cached rows
+    cached = _metadata_rows.get(store)
+    if cached is None or cached[0] is not store.index_to_docstore_id or cached[1] != store.index.ntotal:
+        rows = [
+            (faiss_id, store.docstore.search(doc_id).metadata)
+            for faiss_id, doc_id in store.index_to_docstore_id.items()
+        ]
+        cached = (store.index_to_docstore_id, store.index.ntotal, rows)
+        _metadata_rows[store] = cached
+    return cached[2]
+
+
+def faiss_search(store, vector: List[float], k: int, conditions: List[Condition]) -> List[Tuple]:
+    """FAISS top-k restricted to chunks whose metadata match the filters."""
+    import faiss
+    import numpy as np
+
+    ids = [faiss_id for faiss_id, metadata in _faiss_rows(store) if matches(metadata, conditions)]
+    if not ids:
+        return []
+
+    query = np.array([vector], dtype=np.float32)
+    if getattr(store, "_normalize_L2", False):
+        faiss.normalize_L2(query)
+    params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.array(ids, dtype=np.int64)))
+    scores, indices = store.index.search(query, min(k, len(ids)), params=params)
+
+    results = []
+    for score, faiss_id in zip(scores[0], indices[0]):
+        if faiss_id == -1:
+            continue
+        doc_id = store.index_to_docstore_id[faiss_id]
+        doc = store.docstore.search(doc_id)
+        results.append((doc, float(score)))
+    return results
+
+
+def search_by_vector(store, vector: List[float], k: int,
+                     conditions: Optional[List[Condition]] = None,
+                     vectors: Optional[Dict] = None) -> List[Tuple]:
+    """Return [(document, score)] for a precomputed query embedding.
+
+    A vectors dict collects the stored Cosmos DB embeddings of the results
+    (FAISS vectors are local, so it is left untouched for FAISS).
+    """
+    if not hasattr(store, "index_to_docstore_id"):
+        # AzureCosmosDBNoSqlVectorSearch has no search-by-vector method; query
+        # its container directly (unfiltered when there are no conditions)
+        return cosmos_search(store._container, vector, k, conditions or [], vectors=vectors)
+    if conditions:
+        return faiss_search(store, vector, k, conditions)
+    return store.similarity_search_with_score_by_vector(vector, k=k)
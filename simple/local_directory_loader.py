@@ -0,0 +1,227 @@
+"""Incremental, parallel loader for local markdown/HTML corpora.
+
+Walks a directory tree, reads each file through mmap, and hashes, parses and
+chunks it in a process pool. A JSON manifest of size, mtime, content hash and
+chunk ids per file lets re-runs skip unchanged files and delete the chunks of
+changed or removed ones. Duplicate chunks among the new ones are dropped
+(chunk_dedup); a file whose chunks were merged into another file's records it
+under "duplicate_of" and is re-chunked whenever that file changes. Used by
+both simple_load_data.py and cosmosdb/load_data.py.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import chunk_dedup
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTENSIONS = (".md", ".markdown", ".html", ".htm")
+HTML_EXTENSIONS = (".html", ".htm")
+
+
+class DirectoryChanges(NamedTuple):
+    """Chunks to add and remove to bring a store in line with a directory."""
+
+    documents: list
+    ids: List[str]
+    stale_ids: List[str]
+    manifest: Dict[str, dict]
+    unchanged_files: int
+    changed_files: int
+    removed_files: int
+    dedup_stats: Optional[chunk_dedup.DedupStats] = None
+
+
+def load_manifest(manifest_path: str) -> Dict[str, dict]:
+    """Load the manifest written by the previous run, or an empty one."""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest_path: str, manifest: Dict[str, dict]) -> None:
+    """Atomically write the manifest so an interrupted run keeps the old one."""
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def scan_directory(root: str, extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS) -> Dict[str, Tuple[int, int]]:
+    """Return {relative path: (size, mtime_ns)} for matching files under root."""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Skip hidden directories such as .git
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            if not filename.lower().endswith(extensions):
+                continue
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+            files[rel_path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def chunk_ids(rel_path: str, count: int) -> List[str]:
+    """Deterministic chunk ids so a file's chunks can be replaced on change."""
+    prefix = hashlib.sha1(rel_path.encode("utf-8")).hexdigest()[:16]
+    return [f"{prefix}-{i}" for i in range(count)]
+
+
+def _read_file(path: str) -> bytes:
+    """Read a file through mmap (empty files cannot be mapped)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[:]
+
+
+def _process_file(args: Tuple[str, str, Optional[str], int, int]) -> Tuple[str, str, Optional[List[str]]]:
+    """Hash, parse and chunk one file in a worker process.
+
+    Returns (relative path, content hash, chunks); chunks is None when the
+    hash matches the previous run.
+    """
+    root, rel_path, previous_hash, chunk_size, chunk_overlap = args
+    data = _read_file(os.path.join(root, rel_path))
+    content_hash = hashlib.sha256(data).hexdigest()
+    if content_hash == previous_hash:
+        return rel_path, content_hash, None
+
+    text = data.decode("utf-8", errors="replace")
+    if rel_path.lower().endswith(HTML_EXTENSIONS):
+        from bs4 import BeautifulSoup
+
+        text = BeautifulSoup(text, "html.parser").get_text("\n")
+
+    from langchain_text_splitters import MarkdownTextSplitter
+
+    splitter = MarkdownTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return rel_path, content_hash, splitter.split_text(text)
+
+
+def load_changed_chunks(
+    root: str,
+    manifest_path: str,
+    chunk_size: int = 1500,
+    chunk_overlap: int = 200,
+    max_workers: Optional[int] = None,
+    extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+) -> DirectoryChanges:
+    """Chunk the files under root that changed since the last manifest.
+
+    Files whose size and mtime match the manifest are skipped without being
+    read; files whose stat changed but whose content hash did not are only
+    re-stamped. The caller deletes `stale_ids` (which include the old chunks
+    of changed files), adds `documents` with `ids` and then saves `manifest`.
+    """
+    from langchain_core.documents import Document
+
+    previous = load_manifest(manifest_path)
+    current = scan_directory(root, extensions)
+
+    removed = [rel_path for rel_path in previous if rel_path not in current]
+    touched = {
+        rel_path for rel_path, (size, mtime_ns) in current.items()
+        if not (previous.get(rel_path) and previous[rel_path]["size"] == size
+                and previous[rel_path]["mtime_ns"] == mtime_ns)
+    }
+
+    # Files whose chunks were merged into a touched or removed file must be
+    # re-chunked, or their content would vanish with the canonical copy. This
+    # includes touched files: one whose content hash did not change would
+    # otherwise keep its old chunks, without the dropped duplicate
+    forced = set()
+    pending = touched | set(removed)
+    while pending:
+        dependents = {
+            rel_path for rel_path in current
+            if rel_path not in forced
+            and pending & set(previous.get(rel_path, {}).get("duplicate_of", ()))
+        }
+        forced |= dependents
+        pending = dependents
+
+    manifest: Dict[str, dict] = {}
+    to_process = []
+    for rel_path in current:
+        entry = previous.get(rel_path)
+        if rel_path in touched or rel_path in forced:
+            previous_hash = entry["hash"] if entry and rel_path not in forced else None
+            to_process.append((root, rel_path, previous_hash, chunk_size, chunk_overlap))
+        else:
+            manifest[rel_path] = entry
+
+    stale_ids = [chunk_id for rel_path in removed for chunk_id in previous[rel_path]["ids"]]
+
+    documents = []
+    ids: List[str] = []
+    unchanged_files = len(manifest)
+    changed_files = 0
+
+    if to_process:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunksize = max(1, len(to_process) // ((max_workers or os.cpu_count() or 1) * 4))
+            results = executor.map(_process_file, to_process, chunksize=chunksize)
+            for rel_path, content_hash, chunks in results:
+                size, mtime_ns = current[rel_path]
+                entry = previous.get(rel_path)
+                if chunks is None:
+                    # Touched but identical content: keep existing chunks
+                    manifest[rel_path] = dict(entry, size=size, mtime_ns=mtime_ns)
+                    unchanged_files += 1
+                    continue
+
+                if entry:
+                    stale_ids.extend(entry["ids"])
+                new_ids = chunk_ids(rel_path, len(chunks))
+                for i, chunk in enumerate(chunks):
+                    documents.append(
+                        Document(page_content=chunk, metadata={"source": rel_path, "chunk": i})
+                    )
+                ids.extend(new_ids)
+                manifest[rel_path] = {
+                    "size": size,
+                    "mtime_ns": mtime_ns,
+                    "hash": content_hash,
+                    "ids": new_ids,
+                }
+                changed_files += 1
+
+    sources = [doc.metadata["source"] for doc in documents]
+    documents, canonical, dedup_stats = chunk_dedup.deduplicate(documents)
+    for i, j in enumerate(canonical):
+        if i == j:
+            continue
+        entry = manifest[sources[i]]
+        entry["ids"] = [chunk_id for chunk_id in entry["ids"] if chunk_id != ids[i]]
+        if sources[j] != sources[i] and sources[j] not in entry.setdefault("duplicate_of", []):
+            entry["duplicate_of"].append(sources[j])
+    ids = [chunk_id for i, chunk_id in enumerate(ids) if canonical[i] == i]
+
+    logger.info(
+        f"Scanned {len(current)} files under {root}: {changed_files} changed, "
+        f"{unchanged_files} unchanged, {len(removed)} removed"
+    )
+    return DirectoryChanges(
+        documents=documents,
+        ids=ids,
+        stale_ids=stale_ids,
+        manifest=manifest,
+        unchanged_files=unchanged_files,
+        changed_files=changed_files,
+        removed_files=len(removed),
+        dedup_stats=dedup_stats,
+    )
@@ -0,0 +1,135 @@
+"""Multi-query retrieval for follow-up questions.
+
+With MULTI_QUERY=true the chains search with the raw question plus a
+standalone rewrite that resolves references to the chat history ("what about
+the other one?"). All variants are embedded in one batched call, searched
+concurrently, and the hits are fused with reciprocal rank fusion and
+deduplicated by chunk id, so the extra searches cost the slowest single
+search rather than their sum.
+"""
+import os
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import rerank
+import retrieval_cache
+from filtered_search import Condition, search_by_vector
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+multi_query_enabled = os.environ.get("MULTI_QUERY", "false").lower() == "true"
+
+# Standard reciprocal rank fusion constant
+RRF_K = 60
+
+REWRITE_PROMPT = """Given the conversation below and a follow-up question, rewrite the follow-up question
+as a standalone question that can be understood without the conversation. Keep the wording close to the original.
+Reply with the rewritten question only.
+
+Conversation:
+{history}
+
+Follow-up question: {question}
+
+Standalone question:"""
+
+
+def rewrite_query(llm, query: str, history: str) -> str:
+    """Ask the LLM for a history-independent version of the question."""
+    response = llm.invoke(REWRITE_PROMPT.format(history=history, question=query))
+    text = response.content if hasattr(response, "content") else str(response)
+    return text.strip().strip('"') or query
+
+
+def query_variants(llm, query: str, history: str, has_history: bool) -> List[str]:
+    """Raw query plus, when there is history to resolve, its standalone rewrite."""
+    variants = [query]
+    if has_history:
+        try:
+            rewritten = rewrite_query(llm, query, history)
+            if rewritten.lower() != query.lower():
+                variants.append(rewritten)
+        except Exception as e:
+            logger.warning(f"Query rewrite failed, using the raw query only: {str(e)}")
+    return variants
+
+
+def chunk_key(doc) -> str:
+    """Stable chunk identity: the store id when present, else source + content."""
+    doc_id = getattr(doc, "id", None) or doc.metadata.get("id")
+    if doc_id:
+        return str(doc_id)
+    content = f"{doc.metadata.get('source')}\n{doc.page_content}"
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def fuse(result_lists: List[List[Tuple]], k: int) -> List:
+    """Reciprocal rank fusion of [(doc, score)] lists, deduplicated by chunk."""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, object] = {}
+    for results in result_lists:
+        for rank, (doc, _) in enumerate(results):
+            key = chunk_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
+
+
+def retrieve(store, embeddings, queries: List[str], k: int,
+             conditions: Optional[List[Condition]] = None,
+             cache_scope: Optional[str] = None) -> List:
+    """Search all query variants concurrently and return the fused top-k docs.
+
+    With a cache_scope (backend and index version) and RETRIEVAL_CACHE=true,
+    variants answered before skip both their embedding and their search.
+    With RERANK=true, RERANK_CANDIDATES chunks are fetched and reranked
+    against all variants, so a rewritten follow-up counts as much as the raw one.
+    """
+    k, final_k = rerank.candidate_count(k), k
+    cache = retrieval_cache.get_cache() if cache_scope else None
+    results: Dict[str, List[Tuple]] = {}
+    if cache is not None:
+        for query in queries:
+            hit = cache.get(cache_scope, query, k, conditions)
+            if hit is not None:
+                results[query] = hit
+
+    missing = [query for query in queries if query not in results]
+    vectors: Dict[str, List[float]] = {}
+    # Stored vectors of the Cosmos DB candidates, returned by the searches
+    stored = {} if rerank.rerank_enabled else None
+    if missing:
+        start = time.perf_counter()
+        if len(missing) == 1:
+            vectors[missing[0]] = embeddings.embed_query(missing[0])
+            searched = [search_by_vector(store, vectors[missing[0]], k, conditions, stored)]
+        else:
+            # One batched embedding call for all variants
+            vectors = dict(zip(missing, embeddings.embed_documents(missing)))
+            with ThreadPoolExecutor(max_workers=len(vectors)) as pool:
+                searched = list(pool.map(
+                    lambda v: search_by_vector(store, v, k, conditions, stored), vectors.values()
+                ))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for query, query_results in zip(missing, searched):
+            results[query] = query_results
+            if cache is not None:
+                cache.put(cache_scope, query, k, conditions, query_results, elapsed_ms)
+
+    if len(queries) == 1:
+        candidates = [doc for doc, _ in results[queries[0]]]
+    else:
+        candidates = fuse([results[query] for query in queries], k)
+    if not rerank.rerank_enabled:
+        return candidates[:final_k]
+    # Variants answered from the cache still need their vectors for the rerank
+    uncached = [query for query in queries if query not in vectors]
+    if uncached:
+        vectors.update(zip(uncached, embeddings.embed_documents(uncached)))
+    return rerank.rerank(store, queries, [vectors[query] for query in queries], candidates, final_k, stored)
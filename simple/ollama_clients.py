@@ -0,0 +1,127 @@
+"""Shared Ollama clients with model residency control and warm-up.
+
+Every module gets its embeddings and chat models from here, so each model has
+one client per process instead of a new one per store, chain or question, and
+all of them share one pooled keep-alive HTTP transport to the Ollama server.
+`keep_alive` tells Ollama how long to keep each model loaded after a request,
+and `warm_up()` loads both models through the same clients before the first
+question so it does not pay the model load.
+"""
+import os
+import re
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# Ollama duration ("30m", "1h"), seconds, or -1 to keep a model loaded forever
+default_keep_alive = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+embeddings_keep_alive = os.environ.get("EMBEDDINGS_KEEP_ALIVE", default_keep_alive)
+chat_keep_alive = os.environ.get("CHAT_KEEP_ALIVE", default_keep_alive)
+warm_up_enabled = os.environ.get("OLLAMA_WARM_UP", "true").lower() == "true"
+
+_clients: Dict[Tuple[str, str], object] = {}
+_transports: Optional[Dict[str, dict]] = None
+_lock = threading.RLock()
+
+DURATION_UNITS = {"h": 3600, "m": 60, "s": 1}
+
+
+def parse_keep_alive(value: str) -> int:
+    """Seconds for an Ollama duration such as "30m", "1h30m", "90s", "300" or "-1".
+
+    OllamaEmbeddings only accepts an integer keep_alive, so durations are
+    converted for every client.
+    """
+    value = value.strip().lower()
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+)([hms])", value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        raise ValueError(f"Invalid keep_alive duration {value!r}, expected e.g. 30m, 1h, 90s or seconds")
+    return sum(int(n) * DURATION_UNITS[u] for n, u in parts)
+
+
+def _client_kwargs() -> Dict[str, dict]:
+    """httpx transports shared by every client, so they share one connection pool."""
+    global _transports
+    with _lock:
+        if _transports is None:
+            import httpx
+
+            _transports = {
+                "sync_client_kwargs": {"transport": httpx.HTTPTransport()},
+                "async_client_kwargs": {"transport": httpx.AsyncHTTPTransport()},
+            }
+        return _transports
+
+
+def _shared(kind: str, model: str, factory):
+    key = (kind, model)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def get_embeddings(model: str):
+    """Shared OllamaEmbeddings client for model."""
+    from langchain_ollama import OllamaEmbeddings
+
+    return _shared(
+        "embeddings",
+        model,
+        lambda: OllamaEmbeddings(model=model, keep_alive=parse_keep_alive(embeddings_keep_alive), **_client_kwargs()),
+    )
+
+
+def get_chat_model(model: str):
+    """Shared ChatOllama client for model."""
+    from langchain_ollama import ChatOllama
+
+    return _shared(
+        "chat",
+        model,
+        lambda: ChatOllama(model=model, keep_alive=parse_keep_alive(chat_keep_alive), **_client_kwargs()),
+    )
+
+
+def get_llm(model: str):
+    """Shared OllamaLLM (completion) client for model."""
+    from langchain_ollama import OllamaLLM
+
+    return _shared(
+        "llm",
+        model,
+        lambda: OllamaLLM(model=model, keep_alive=parse_keep_alive(chat_keep_alive), **_client_kwargs()),
+    )
+
+
+def warm_up(embeddings_model: str, chat_model: str) -> None:
+    """Load both models into Ollama concurrently before accepting questions."""
+    if not warm_up_enabled:
+        return
+    embeddings = get_embeddings(embeddings_model)
+    chat = get_chat_model(chat_model)
+
+    def load_embeddings():
+        embeddings.embed_query("warm up")
+
+    def load_chat():
+        # A generate request without a prompt only loads the model
+        chat._client.generate(model=chat_model, keep_alive=chat.keep_alive)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = {"embeddings": pool.submit(load_embeddings), "chat": pool.submit(load_chat)}
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                # The first real request will load the model instead
+                logger.warning(f"Could not warm up {name} model: {str(e)}")
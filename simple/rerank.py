@@ -0,0 +1,191 @@
+"""Second-stage reranking of over-fetched vector search candidates.
+
+With RERANK=true the chains and batch mode fetch RERANK_CANDIDATES chunks
+instead of k, then rescore them on the CPU: exact cosine similarity between
+the query and the stored full-precision chunk vectors (the Cosmos DB
+quantizedFlat index ranks on compressed vectors), plus the idf-weighted share
+of query terms found in the chunk. Only the best k reach the prompt, so TOP_K
+can stay small. Cosmos DB candidates bring their vectors from the first-stage
+query; only results served from the retrieval cache need a fetch. If getting
+the vectors pushes a query past RERANK_BUDGET_MS the first-stage order is
+kept; rerank time is logged at INFO.
+"""
+import os
+import re
+import math
+import time
+import atexit
+import logging
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+rerank_enabled = os.environ.get("RERANK", "false").lower() == "true"
+rerank_candidates = int(os.environ.get("RERANK_CANDIDATES", "20"))
+rerank_budget_ms = float(os.environ.get("RERANK_BUDGET_MS", "50"))
+# Weight of the lexical overlap feature relative to cosine similarity
+lexical_weight = float(os.environ.get("RERANK_LEXICAL_WEIGHT", "0.3"))
+
+# Log cumulative statistics every this many reranked queries
+STATS_INTERVAL = 100
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or that the this "
+    "to was what when where which who why with you your".split()
+)
+
+# FAISS store -> (id map, vector count, {docstore id: faiss id}), rebuilt on any change
+_faiss_positions: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+class RerankStats:
+    """Cumulative rerank cost, logged every STATS_INTERVAL queries and at exit."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.over_budget = 0
+
+    def record(self, elapsed_ms: float, over_budget: bool) -> None:
+        with self._lock:
+            self.queries += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.over_budget += int(over_budget)
+            if self.queries % STATS_INTERVAL == 0:
+                self.log()
+
+    def log(self) -> None:
+        if self.queries:
+            logger.info(
+                f"Rerank: {self.queries} queries, {self.total_ms / self.queries:.1f} ms average, "
+                f"{self.max_ms:.1f} ms max, {self.over_budget} over the {rerank_budget_ms:.0f} ms budget"
+            )
+
+
+stats = RerankStats()
+atexit.register(stats.log)
+
+
+def candidate_count(k: int) -> int:
+    """How many chunks the first stage should fetch for a final top k."""
+    return max(k, rerank_candidates) if rerank_enabled else k
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in re.findall(r"\w+", text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def lexical_scores(query: str, texts: List[str]) -> List[float]:
+    """Idf-weighted fraction of query terms present in each text (idf over the candidates)."""
+    query_terms = set(_terms(query))
+    if not query_terms:
+        return [0.0] * len(texts)
+    doc_terms = [set(_terms(text)) for text in texts]
+    idf = {
+        term: math.log(1 + len(texts) / (1 + sum(term in terms for terms in doc_terms)))
+        for term in query_terms
+    }
+    total = sum(idf.values())
+    return [sum(idf[t] for t in query_terms if t in terms) / total for terms in doc_terms]
+
+
+def _faiss_vectors(store, doc_ids: List[str]) -> Dict[str, List[float]]:
+    # FAISS.delete() renumbers positions and replaces index_to_docstore_id,
+    # adds grow the index, so either change invalidates the cached positions
+    cached = _faiss_positions.get(store)
+    if cached is None or cached[0] is not store.index_to_docstore_id or cached[1] != store.index.ntotal:
+        positions = {doc_id: faiss_id for faiss_id, doc_id in store.index_to_docstore_id.items()}
+        cached = (store.index_to_docstore_id, store.index.ntotal, positions)
+        _faiss_positions[store] = cached
+    positions = cached[2]
+    return {
+        doc_id: store.index.reconstruct(positions[doc_id])
+        for doc_id in doc_ids if doc_id in positions
+    }
+
+
+def _cosmos_vectors(container, doc_ids: List[str], embedding_key: str = "embedding") -> Dict[str, List[float]]:
+    items = container.query_items(
+        query=f"SELECT c.id, c[\"{embedding_key}\"] AS embedding FROM c WHERE ARRAY_CONTAINS(@ids, c.id)",
+        parameters=[{"name": "@ids", "value": doc_ids}],
+        enable_cross_partition_query=True,
+    )
+    return {item["id"]: item["embedding"] for item in items if item.get("embedding") is not None}
+
+
+def stored_vectors(store, doc_ids: List[str]) -> Dict[str, List[float]]:
+    """Full-precision stored vectors of the given chunk ids."""
+    if not doc_ids:
+        return {}
+    if hasattr(store, "index_to_docstore_id"):
+        return _faiss_vectors(store, doc_ids)
+    # AzureCosmosDBNoSqlVectorSearch keeps its container client here
+    return _cosmos_vectors(store._container, doc_ids)
+
+
+def doc_id(doc) -> str:
+    """Store id of a result; langchain's Cosmos DB store puts it in the metadata."""
+    return getattr(doc, "id", None) or doc.metadata.get("id")
+
+
+def rerank(store, queries: List[str], query_vectors: List[List[float]], candidates: List, k: int,
+           vectors: Optional[Dict[str, List[float]]] = None) -> List:
+    """Return the best k of the first-stage candidates (documents, best first).
+
+    With several query variants (multi-query), each candidate is scored
+    against the variant it matches best. vectors holds stored vectors the
+    first stage already returned (search_by_vector); the rest are fetched.
+    """
+    if len(candidates) <= 1:
+        return candidates[:k]
+    import numpy as np
+
+    start = time.perf_counter()
+    doc_ids = [doc_id(doc) for doc in candidates]
+    known = vectors or {}
+    try:
+        missing = [i for i in doc_ids if i and i not in known]
+        vectors = {**known, **stored_vectors(store, missing)}
+    except Exception as e:
+        logger.warning(f"Could not fetch candidate vectors, keeping first-stage order: {str(e)}")
+        vectors = None
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if vectors is None:
+        stats.record(elapsed_ms, False)
+        return candidates[:k]
+    if elapsed_ms > rerank_budget_ms:
+        logger.info(f"Rerank skipped: fetching vectors took {elapsed_ms:.1f} ms")
+        stats.record(elapsed_ms, True)
+        return candidates[:k]
+
+    q = np.asarray(query_vectors, dtype=np.float32)
+    norms = np.linalg.norm(q, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    q /= norms
+    texts = [doc.page_content for doc in candidates]
+    lexical = np.max([lexical_scores(query, texts) for query in queries], axis=0)
+
+    scores: List[Tuple[float, int]] = []
+    for rank, (candidate_id, overlap) in enumerate(zip(doc_ids, lexical)):
+        vector = vectors.get(candidate_id)
+        if vector is None:
+            # No stored vector (e.g. no id): fall back to a rank-based similarity
+            cosine = 1.0 - rank / len(candidates)
+        else:
+            v = np.asarray(vector, dtype=np.float32)
+            cosine = float(np.max(q @ v)) / (float(np.linalg.norm(v)) or 1.0)
+        scores.append((cosine + lexical_weight * float(overlap), rank))
+
+    # Ties keep first-stage order
+    ranked = sorted(scores, key=lambda s: (-s[0], s[1]))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    stats.record(elapsed_ms, elapsed_ms > rerank_budget_ms)
+    logger.debug(f"Reranked {len(candidates)} candidates in {elapsed_ms:.1f} ms")
+    return [candidates[rank] for _, rank in ranked[:k]]
@@ -0,0 +1,212 @@
+"""Cache of vector search results for repeated questions.
+
+Maps (normalised query, k, filters, index version) to the ranked chunks and
+scores, so asking the same question again skips the query embedding and the
+vector search (and, for Cosmos DB, the RUs and round trip). Entries live in a
+bounded in-memory LRU with a TTL and, when RETRIEVAL_CACHE_PATH is set, in a
+SQLite file shared by every process on the machine. The loaders bump the
+index version on every load, which makes older entries unreachable.
+
+Enable with RETRIEVAL_CACHE=true. Hit rate and time saved are logged at INFO.
+"""
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+cache_enabled = os.environ.get("RETRIEVAL_CACHE", "false").lower() == "true"
+cache_size = int(os.environ.get("RETRIEVAL_CACHE_SIZE", "1024"))
+cache_ttl = float(os.environ.get("RETRIEVAL_CACHE_TTL", "3600"))
+# Optional shared on-disk tier, e.g. ./.retrieval_cache.sqlite
+cache_path = os.environ.get("RETRIEVAL_CACHE_PATH")
+
+VERSION_FILE = "index_version"
+# Log cumulative statistics every this many lookups
+STATS_INTERVAL = 100
+
+
+def read_index_version(path: str) -> str:
+    """Version written by the last load, or "0" if the index predates versioning."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip() or "0"
+    except FileNotFoundError:
+        return "0"
+
+
+def bump_index_version(path: str) -> str:
+    """Record that the index changed; cached results for older versions are ignored."""
+    version = f"{time.time_ns():x}"
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(version)
+    return version
+
+
+def normalise_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class RetrievalCache:
+    """LRU + TTL cache with an optional shared SQLite tier."""
+
+    def __init__(self, max_entries: int, ttl: float, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, list]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        # Average cost of a miss, used to estimate the time a hit saves
+        self._miss_ms_total = 0.0
+        if path:
+            import sqlite3
+
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS retrieval_cache (key TEXT PRIMARY KEY, created REAL, value TEXT)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(scope: str, query: str, k: int, conditions) -> str:
+        payload = json.dumps([scope, normalise_query(query), k, conditions or []], default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _get_disk(self, key: str) -> Optional[Tuple[float, list]]:
+        row = self._db.execute(
+            "SELECT created, value FROM retrieval_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def get(self, scope: str, query: str, k: int, conditions=None) -> Optional[List[Tuple]]:
+        """Cached [(document, score)] or None."""
+        key = self.make_key(scope, query, k, conditions)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._get_disk(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                entry = None
+                self._entries.pop(key, None)
+
+            if entry is None:
+                self.misses += 1
+                self._log_stats()
+                return None
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._trim()
+            self.hits += 1
+            if self.misses:
+                self.saved_ms += self._miss_ms_total / self.misses
+            self._log_stats()
+        return _to_results(entry[1])
+
+    def put(self, scope: str, query: str, k: int, conditions, results: List[Tuple], elapsed_ms: float) -> None:
+        """Store results of a search that took elapsed_ms."""
+        key = self.make_key(scope, query, k, conditions)
+        entry = (time.time(), _from_results(results))
+        try:
+            value = json.dumps(entry[1])
+        except (TypeError, ValueError) as e:
+            # Metadata that cannot be stored as JSON: serve this query uncached
+            logger.debug(f"Not caching results for {query!r}: {str(e)}")
+            return
+        with self._lock:
+            self._miss_ms_total += elapsed_ms
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._trim()
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO retrieval_cache (key, created, value) VALUES (?, ?, ?)",
+                    (key, entry[0], value),
+                )
+                self._db.execute(
+                    "DELETE FROM retrieval_cache WHERE created < ?", (entry[0] - self.ttl,)
+                )
+                self._db.commit()
+
+    def _trim(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _log_stats(self, force: bool = False) -> None:
+        lookups = self.hits + self.misses
+        if lookups and (force or lookups % STATS_INTERVAL == 0):
+            logger.info(
+                f"Retrieval cache: {self.hits}/{lookups} hits ({self.hits / lookups:.0%}), "
+                f"~{self.saved_ms:.0f} ms saved"
+            )
+
+
+def _from_results(results: List[Tuple]) -> List[Dict]:
+    return [
+        {
+            "id": getattr(doc, "id", None),
+            "score": None if score is None else float(score),
+            "text": doc.page_content,
+            "metadata": doc.metadata,
+        }
+        for doc, score in results
+    ]
+
+
+def _to_results(entries: List[Dict]) -> List[Tuple]:
+    from langchain_core.documents import Document
+
+    return [
+        (Document(page_content=e["text"], metadata=e["metadata"], id=e["id"]), e["score"])
+        for e in entries
+    ]
+
+
+_cache: Optional[RetrievalCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[RetrievalCache]:
+    """Process-wide cache, or None when RETRIEVAL_CACHE is off."""
+    global _cache
+    if not cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = RetrievalCache(cache_size, cache_ttl, cache_path)
+            atexit.register(_cache._log_stats, True)
+        return _cache
+
+
+def cached_search(scope: str, query: str, k: int, conditions,
+                  search: Callable[[], List[Tuple]]) -> List[Tuple]:
+    """Return cached results for query, or run search() and cache its results."""
+    cache = get_cache()
+    if cache is not None:
+        results = cache.get(scope, query, k, conditions)
+        if results is not None:
+            return results
+
+    start = time.perf_counter()
+    results = search()
+    if cache is not None:
+        cache.put(scope, query, k, conditions, results, (time.perf_counter() - start) * 1000)
+    return results
@@ -2,11 +2,13 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
 
-from langchain_text_splitters import MarkdownTextSplitter
-from langchain_community.document_loaders import WebBaseLoader
 import simple_vector_store
+import local_directory_loader
+import chunk_dedup
+import embedding_reduction
+import retrieval_cache
 import logging
-from typing import List
+from typing import List, Optional
 
 # Set up logging
 logging.basicConfig(level=logging.WARNING)
@@ -15,6 +17,8 @@ logger = logging.getLogger(__name__)
 
 def load(urls: List[str], create_container: bool = True) -> None:
     """Load documents from URLs into simple vector store."""
+    from langchain_text_splitters import MarkdownTextSplitter
+    from langchain_community.document_loaders import WebBaseLoader
 
     print("Loading documents from URLs:", urls)
 
@@ -33,8 +37,18 @@ def load(urls: List[str], create_container: bool = True) -> None:
         if not split_docs:
             raise ValueError("No document chunks were created after splitting")
 
+        # Embed boilerplate repeated across pages only once
+        split_docs, _, dedup_stats = chunk_dedup.deduplicate(split_docs)
+        print(f"Chunk dedup: {dedup_stats}")
+
+        # The store is rebuilt, so any PCA reduction is refitted on this corpus
+        embeddings = simple_vector_store.get_embeddings()
+        embedding_reduction.fit_if_needed(
+            embeddings, [doc.page_content for doc in split_docs], refit=True
+        )
+
         # Get vector store instance and add documents
-        store = simple_vector_store.get_instance(create_container)
+        store = simple_vector_store.get_instance(create_container, embeddings)
         
         # Clear existing dummy data and add real documents
         store.delete([store.index_to_docstore_id[0]])  # Remove dummy doc
@@ -44,15 +58,81 @@ def load(urls: List[str], create_container: bool = True) -> None:
         print("Data loaded into in-memory vector store")
         
         # Save the store for later use
-        store.save_local("./vector_store")
+        simple_vector_store.save_local(store, "./vector_store")
+        simple_vector_store.save_embedding_info("./vector_store", store.index.d)
+        retrieval_cache.bump_index_version(simple_vector_store.index_version_path)
         print("Vector store saved to ./vector_store")
 
+        # The store was rebuilt, so a local directory manifest no longer applies
+        manifest_path = os.path.join("./vector_store", "local_manifest.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
     except Exception as e:
         logger.error(f"Error during data loading: {str(e)}")
         raise
 
 
+def load_directory(path: str, store_path: str = "./vector_store", max_workers: Optional[int] = None) -> None:
+    """Incrementally load a local markdown/HTML directory into the FAISS store."""
+
+    print("Loading documents from directory:", path)
+    manifest_path = os.path.join(store_path, "local_manifest.json")
+
+    try:
+        # Only trust the manifest if the store it describes still exists
+        store = None
+        if os.path.exists(os.path.join(store_path, "index.faiss")):
+            if os.path.exists(manifest_path):
+                store = simple_vector_store.load_local(store_path)
+        elif os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        changes = local_directory_loader.load_changed_chunks(
+            path, manifest_path, max_workers=max_workers
+        )
+
+        if store is None:
+            if not changes.documents:
+                raise ValueError("No document chunks were created from the provided directory")
+            embeddings = simple_vector_store.get_embeddings(store_path)
+            embedding_reduction.fit_if_needed(
+                embeddings, [doc.page_content for doc in changes.documents], refit=True
+            )
+            store = simple_vector_store.get_instance(embeddings=embeddings)
+            store.delete([store.index_to_docstore_id[0]])  # Remove dummy doc
+        else:
+            existing_ids = set(store.index_to_docstore_id.values())
+            stale_ids = [i for i in changes.stale_ids if i in existing_ids]
+            if stale_ids:
+                store.delete(stale_ids)
+
+        if changes.documents:
+            store.add_documents(changes.documents, ids=changes.ids)
+
+        print(
+            f"{changes.changed_files} changed, {changes.unchanged_files} unchanged, "
+            f"{changes.removed_files} removed files; added {len(changes.documents)} chunks, "
+            f"deleted {len(changes.stale_ids)} chunks"
+        )
+        print(f"Chunk dedup: {changes.dedup_stats}")
+
+        simple_vector_store.save_local(store, store_path)
+        simple_vector_store.save_embedding_info(store_path, store.index.d)
+        retrieval_cache.bump_index_version(os.path.join(store_path, "index_version"))
+        local_directory_loader.save_manifest(manifest_path, changes.manifest)
+        print(f"Vector store saved to {store_path}")
+
+    except Exception as e:
+        logger.error(f"Error during directory loading: {str(e)}")
+        raise
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--dir":
+        load_directory(sys.argv[2])
+        sys.exit(0)
+
     doc_urls = [
         "https://raw.githubusercontent.com/MicrosoftDocs/azure-databases-docs/refs/heads/main/articles/cosmos-db/nosql/vector-search.md",
         "https://raw.githubusercontent.com/MicrosoftDocs/azure-databases-docs/refs/heads/main/articles/cosmos-db/nosql/multi-tenancy-vector-search.md",
@@ -1,5 +1,7 @@
-from langchain_ollama import ChatOllama
 import simple_vector_store
+import multi_query
+import filtered_search
+import ollama_clients
 import os
 import logging
 from typing import List, Dict, Any
@@ -8,21 +10,39 @@ from typing import List, Dict, Any
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
-# Validate required environment variables
+# Required environment variables are validated on first use (see validate_env)
+# so that importing this module does not pull in langchain or Ollama.
 required_env_vars = ["CHAT_MODEL"]
-missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
-if missing_vars:
-    raise ValueError(
-        f"Missing required environment variables: {', '.join(missing_vars)}"
-    )
 
-chat_model = os.environ["CHAT_MODEL"]
+chat_model = os.environ.get("CHAT_MODEL")
 # Get top_k from environment variable with default
 top_k = int(os.environ.get("TOP_K", "5"))
+# Optional metadata filter applied inside the search, e.g. "source=docs/a.md;date>=2024-01-01"
+rag_filter = filtered_search.parse_filters(os.environ.get("RAG_FILTER"))
 
 # Simple chat history storage
 chat_history: List[Dict[str, str]] = []
 
+# Vector store loaded on the first question and reused afterwards
+_store = None
+
+
+def validate_env() -> None:
+    """Raise if a required environment variable is missing."""
+    missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
+    if missing_vars:
+        raise ValueError(
+            f"Missing required environment variables: {', '.join(missing_vars)}"
+        )
+
+
+def get_store():
+    """Load the saved FAISS store once and cache it for later questions."""
+    global _store
+    if _store is None:
+        _store = simple_vector_store.load_local("./vector_store")
+    return _store
+
 
 def format_chat_history(history: List[Dict[str, str]], max_turns: int = 5) -> str:
     if not history:
@@ -50,26 +70,12 @@ def clear_history() -> None:
     chat_history = []
 
 
-def answer_question(query: str) -> str:
-    """Answer a question using RAG."""
-    try:
-        # Load the saved vector store
-        from langchain_ollama import OllamaEmbeddings
-        from langchain_community.vectorstores import FAISS
-        embeddings = OllamaEmbeddings(model=os.environ["EMBEDDINGS_MODEL"])
-        store = FAISS.load_local("./vector_store", embeddings, allow_dangerous_deserialization=True)
-        
-        # Get relevant documents
-        docs = store.similarity_search(query, k=top_k)
-        
-        # Combine context
-        context = "\n\n".join([doc.page_content for doc in docs])
-        
-        # Format chat history
-        history = format_chat_history(chat_history)
-        
-        # Create prompt
-        prompt = f"""You are a friendly assistant for question-answering tasks. Use the following retrieved context to answer the question. 
+def build_prompt(query: str, docs: list, history: str = "No previous conversation.") -> str:
+    """Build the RAG prompt from retrieved documents and formatted history."""
+    # Combine context
+    context = "\n\n".join([doc.page_content for doc in docs])
+
+    return f"""You are a friendly assistant for question-answering tasks. Use the following retrieved context to answer the question. 
 Do not start the answer with 'According to the provided context'. 
 Consider the previous conversation when relevant, but ensure your answer is primarily based on the retrieved context. 
 If the answer is not present in the provided context, just say so. Ensure that the answer is strictly based on the context given, 
@@ -86,8 +92,29 @@ Question: {query}
 
 Answer:"""
 
+
+def answer_question(query: str) -> str:
+    """Answer a question using RAG."""
+    try:
+        validate_env()
+
+        # Load the saved vector store
+        store = get_store()
+        llm = ollama_clients.get_chat_model(chat_model)
+        history = format_chat_history(chat_history)
+        
+        # Get relevant documents
+        queries = [query]
+        if multi_query.multi_query_enabled:
+            queries = multi_query.query_variants(llm, query, history, bool(chat_history))
+        docs = multi_query.retrieve(
+            store, store.embeddings, queries, top_k, rag_filter, simple_vector_store.cache_scope()
+        )
+        
+        # Create prompt with the recent conversation
+        prompt = build_prompt(query, docs, history)
+
         # Use LLM to generate answer
-        llm = ChatOllama(model=chat_model)
         response = llm.invoke(prompt)
         
         return response.content if hasattr(response, 'content') else str(response)
@@ -99,6 +126,10 @@ Answer:"""
 
 if __name__ == "__main__":
     try:
+        validate_env()
+        simple_vector_store.validate_env()
+        print("Loading models...")
+        ollama_clients.warm_up(os.environ["EMBEDDINGS_MODEL"], chat_model)
         print(f"Starting RAG chat application. Using model: {chat_model}")
         print(f"Vector search with k={top_k}")
         print("Enter your questions below. Type 'exit' to quit, 'clear' to clear chat history, 'history' to view chat history.")
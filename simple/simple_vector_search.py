@@ -3,34 +3,41 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 import simple_vector_store
+import filtered_search
+import retrieval_cache
 import sys
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 # Set up logging
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
 
-def search_vectors(query: str, top_k: int = 5) -> List[Tuple]:
-    """Perform vector similarity search."""
+def search_vectors(query: str, top_k: int = 5,
+                   conditions: Optional[List[filtered_search.Condition]] = None) -> List[Tuple]:
+    """Perform vector similarity search, optionally restricted by metadata filters."""
     try:
         print(f'Searching top {top_k} results for query: "{query}"\n')
 
-        store = simple_vector_store.get_instance()
-        
+        # Report missing settings before looking for the store
+        simple_vector_store.validate_env()
+
         # Load the saved store if it exists
-        try:
-            from langchain_ollama import OllamaEmbeddings
-            import os
-            embeddings = OllamaEmbeddings(model=os.environ["EMBEDDINGS_MODEL"])
-            from langchain_community.vectorstores import FAISS
-            store = FAISS.load_local("./vector_store", embeddings, allow_dangerous_deserialization=True)
-        except:
+        if not os.path.exists(os.path.join("./vector_store", "index.faiss")):
             print("No saved vector store found. Please run simple_load_data.py first.")
             return []
+        store = simple_vector_store.load_local("./vector_store")
+
+        def search():
+            if conditions:
+                vector = store.embeddings.embed_query(query)
+                return filtered_search.search_by_vector(store, vector, top_k, conditions)
+            return store.similarity_search_with_score(query=query, k=top_k)
 
-        results = store.similarity_search_with_score(query=query, k=top_k)
+        results = retrieval_cache.cached_search(
+            simple_vector_store.cache_scope(), query, top_k, conditions, search
+        )
 
         if not results:
             print("No results found for the query.")
@@ -50,26 +57,32 @@ def search_vectors(query: str, top_k: int = 5) -> List[Tuple]:
 
 def main():
     """Main function to handle command line arguments and execute search."""
-    if len(sys.argv) < 2:
-        print("Usage: python simple_vector_search.py <query> [top_k]")
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print("Usage: python simple_vector_search.py <query> [top_k] [--filter <field><op><value> ...]")
         print("Example: python simple_vector_search.py 'How does a vector store work?' 10")
-        sys.exit(1)
+        print("Example: python simple_vector_search.py 'vector index' --filter source=docs/a.md --filter 'date>=2024-01-01'")
+        print("Filters match exact values; URL-loaded chunks have the full URL as source")
+        sys.exit(0 if len(sys.argv) > 1 else 1)
 
     try:
-        query = sys.argv[1]
+        argv, conditions = filtered_search.pop_filter_args(sys.argv[1:])
+        if not argv:
+            print("Error: missing query")
+            sys.exit(1)
+        query = argv[0]
 
         # Optional second argument for top_k
         top_k = 5  # default
-        if len(sys.argv) > 2:
+        if len(argv) > 1:
             try:
-                top_k = int(sys.argv[2])
+                top_k = int(argv[1])
                 if top_k <= 0:
                     raise ValueError("top_k must be a positive integer")
             except ValueError as e:
-                print(f"Invalid top_k value: {sys.argv[2]}. Using default value of 5.")
+                print(f"Invalid top_k value: {argv[1]}. Using default value of 5.")
                 top_k = 5
 
-        search_vectors(query, top_k)
+        search_vectors(query, top_k, conditions)
 
     except Exception as e:
         logger.error(f"Application error: {str(e)}")
@@ -1,31 +1,61 @@
-from langchain_ollama import OllamaEmbeddings
-from langchain_community.vectorstores import FAISS
 import os
 import logging
+import warnings
 
 # Set up logging
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
-# Validate required environment variables
+# create_empty() normalises vectors for an inner-product (cosine) index on
+# purpose; langchain's FAISS warns about that on every create and load
+warnings.filterwarnings("ignore", message="Normalizing L2 is not applicable", category=UserWarning)
+
+# langchain, FAISS and the Ollama client are imported inside the functions
+# below so that importing this module (e.g. for `--help`) stays cheap.
 required_env_vars = ["EMBEDDINGS_MODEL"]
-missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
-if missing_vars:
-    raise ValueError(
-        f"Missing required environment variables: {', '.join(missing_vars)}"
-    )
 
-embeddings_model_name = os.environ["EMBEDDINGS_MODEL"]
+# PCA projection for EMBEDDING_REDUCTION=pca, saved next to the FAISS index
+PCA_FILE = "pca.npz"
+# Bumped on every load so cached retrieval results for the old index expire
+index_version_path = "./vector_store/index_version"
+# Embedding model and width the saved vectors were produced with
+EMBEDDING_INFO_FILE = "embedding_info.json"
+# normalize_L2 and distance strategy, which FAISS.save_local does not persist
+SETTINGS_FILE = "store_settings.json"
+
+
+def validate_env() -> None:
+    """Raise if a required environment variable is missing."""
+    missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
+    if missing_vars:
+        raise ValueError(
+            f"Missing required environment variables: {', '.join(missing_vars)}"
+        )
+
 
-def get_instance(create_container: bool = False):
+def get_embeddings(path: str = "./vector_store"):
+    """Create the Ollama embeddings client, with the reduction of the store at path applied."""
+    validate_env()
+    import embedding_reduction
+    import ollama_clients
+
+    return embedding_reduction.wrap(ollama_clients.get_embeddings(os.environ["EMBEDDINGS_MODEL"]), os.path.join(path, PCA_FILE))
+
+
+def get_instance(create_container: bool = False, embeddings=None):
     """Get a FAISS vector store instance for testing purposes."""
+    validate_env()
+    embeddings_model_name = os.environ["EMBEDDINGS_MODEL"]
     logger.info(f"Using FAISS in-memory vector store with embedding model: {embeddings_model_name}")
 
     try:
-        embeddings = OllamaEmbeddings(model=embeddings_model_name)
+        from langchain_community.vectorstores import FAISS
+        from langchain_core.documents import Document
+
+        if embeddings is None:
+            embeddings = get_embeddings()
         
         # Create a simple FAISS store with dummy documents for initialization
-        from langchain_core.documents import Document
         dummy_docs = [Document(page_content="dummy", metadata={"source": "test"})]
         store = FAISS.from_documents(dummy_docs, embeddings)
         
@@ -34,4 +64,103 @@ def get_instance(create_container: bool = False):
 
     except Exception as e:
         logger.error(f"Failed to create FAISS vector store instance: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+
+def create_empty(dimensions: int, embeddings=None):
+    """Create an empty FAISS store that scores by cosine similarity."""
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    if embeddings is None:
+        embeddings = get_embeddings()
+
+    # Inner product over L2-normalised vectors is cosine similarity, which
+    # matches the distance function of the Cosmos DB vector policy
+    return FAISS(
+        embedding_function=embeddings,
+        index=faiss.IndexFlatIP(dimensions),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        normalize_L2=True,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+
+
+def cache_scope() -> str:
+    """Retrieval cache scope for the current version of the saved store."""
+    import retrieval_cache
+
+    return f"faiss:{retrieval_cache.read_index_version(index_version_path)}"
+
+
+def save_embedding_info(path: str, dimensions: int) -> None:
+    """Record the embedding settings of a saved store, checked by migrate_vectors.py."""
+    import json
+    import embedding_reduction
+
+    info = {
+        "embeddings_model": os.environ.get("EMBEDDINGS_MODEL"),
+        "dimensions": dimensions,
+        "reduction": embedding_reduction.reduction_method,
+    }
+    with open(os.path.join(path, EMBEDDING_INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f)
+
+
+def read_embedding_info(path: str):
+    """Embedding settings recorded by save_embedding_info(), or None for older stores."""
+    import json
+
+    info_path = os.path.join(path, EMBEDDING_INFO_FILE)
+    if not os.path.exists(info_path):
+        return None
+    with open(info_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_local(store, path: str = "./vector_store") -> None:
+    """Save a FAISS store together with the settings FAISS.save_local drops."""
+    import json
+
+    store.save_local(path)
+    settings = {
+        "normalize_L2": store._normalize_L2,
+        "distance_strategy": store.distance_strategy.value,
+    }
+    with open(os.path.join(path, SETTINGS_FILE), "w", encoding="utf-8") as f:
+        json.dump(settings, f)
+
+
+def load_local(path: str = "./vector_store", embeddings=None):
+    """Load a FAISS vector store saved by save_local()."""
+    import json
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    if embeddings is None:
+        embeddings = get_embeddings(path)
+
+    settings_path = os.path.join(path, SETTINGS_FILE)
+    if os.path.exists(settings_path):
+        with open(settings_path, "r", encoding="utf-8") as f:
+            settings = json.load(f)
+        return FAISS.load_local(
+            path,
+            embeddings,
+            allow_dangerous_deserialization=True,
+            normalize_L2=settings["normalize_L2"],
+            distance_strategy=DistanceStrategy(settings["distance_strategy"]),
+        )
+
+    # Saved before the settings were recorded: inner-product indexes come from
+    # create_empty(), which normalises vectors for cosine similarity
+    import faiss
+
+    store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    if store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        store._normalize_L2 = True
+        store.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+    return store
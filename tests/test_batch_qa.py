@@ -0,0 +1,43 @@
+import sys
+import os
+import json
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "simple"))
+
+import batch_qa
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+
+def test_run_batch_writes_json_lines_with_faiss_scores(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    store = FAISS.from_texts(
+        ["Vector search in Cosmos DB", "Multi-tenancy with vector search", "Partition keys"],
+        embeddings,
+        metadatas=[{"source": "a.md"}, {"source": "b.md"}, {"source": "c.md"}],
+    )
+    llm = FakeListChatModel(responses=["answer"])
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text("\n".join(json.dumps({"id": i, "question": f"question {i}"}) for i in range(5)))
+    output = tmp_path / "answers.jsonl"
+
+    written = batch_qa.run_batch(
+        str(questions), str(output), store, embeddings, llm,
+        lambda question, docs: question, top_k=2,
+    )
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert written == 5
+    assert all("error" not in record for record in records)
+    assert sorted(record["id"] for record in records) == list(range(5))
+    for record in records:
+        assert record["answer"] == "answer"
+        assert len(record["sources"]) == 2
+        assert all(isinstance(source["score"], float) for source in record["sources"])
+
+    # Resuming skips every answered question
+    assert batch_qa.run_batch(
+        str(questions), str(output), store, embeddings, llm,
+        lambda question, docs: question, top_k=2,
+    ) == 0
+    assert len(output.read_text().splitlines()) == 5
@@ -0,0 +1,12 @@
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "simple"))
+
+import chunk_dedup
+
+
+def test_exact_duplicates_ignore_case_and_whitespace_but_not_symbols():
+    canonical, stats = chunk_dedup.find_duplicates(["c.x > 1", "c.x < 1", "C.X  >\n1"])
+    assert canonical == [0, 1, 0]
+    assert stats.exact_duplicates == 1
+    assert stats.near_duplicates == 0
@@ -0,0 +1,35 @@
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "simple"))
+
+import local_directory_loader
+
+SHARED = " ".join(f"shared{i}" for i in range(40))
+
+
+def _load(root, manifest_path):
+    changes = local_directory_loader.load_changed_chunks(str(root), str(manifest_path), max_workers=1)
+    local_directory_loader.save_manifest(str(manifest_path), changes.manifest)
+    return changes
+
+
+def test_touched_dependent_file_re_adds_chunk_dropped_as_duplicate(tmp_path):
+    root = tmp_path / "docs"
+    root.mkdir()
+    manifest_path = tmp_path / "manifest.json"
+    (root / "a.md").write_text(SHARED)
+    (root / "b.md").write_text(SHARED)
+    first = _load(root, manifest_path)
+    # One copy of the shared chunk is kept; the other file records the dependency
+    assert len(first.documents) == 1
+    kept = first.documents[0].metadata["source"]
+    other = "b.md" if kept == "a.md" else "a.md"
+    assert first.manifest[other]["duplicate_of"] == [kept]
+
+    # The canonical file changes and the dependent is only touched
+    (root / kept).write_text("completely different content")
+    os.utime(root / other, ns=(0, 1))
+    second = _load(root, manifest_path)
+
+    assert set(first.ids) <= set(second.stale_ids)
+    assert SHARED in [doc.page_content for doc in second.documents]